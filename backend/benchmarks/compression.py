@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Bytes-on-the-wire and CPU cost of response compression
+Builds the JSON bodies that GET /api/registrations and the Excel download
+endpoints return for typical sizes, then compresses each with gzip and brotli
+at several levels through server.compress_body, reporting compressed size,
+ratio and CPU milliseconds per response. Use it to pick COMPRESSION_MIN_SIZE,
+GZIP_COMPRESSION_LEVEL and BROTLI_COMPRESSION_LEVEL.
+
+Usage (from backend/):
+    python benchmarks/compression.py [--sizes 10,100,1000] [--repeats 5] [--output results.json]
+"""
+
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# server.py reads these at import time; nothing connects to MongoDB here
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'compression_benchmark')
+sys.path.insert(0, str(BACKEND_DIR))
+
+import server
+from micro import registration_documents
+
+LEVELS = [('gzip', 1), ('gzip', 6), ('gzip', 9), ('br', 1), ('br', 4), ('br', 6), ('br', 11)]
+
+
+def list_body(docs: list) -> bytes:
+    """Body of GET /api/registrations"""
+    return server.registration_list_adapter.dump_json([server.registration_to_response(doc) for doc in docs])
+
+
+def excel_body(docs: list) -> bytes:
+    """Body of POST /api/admin/download-all-excel"""
+    excel_data = server.create_excel_from_registrations(docs)
+    return json.dumps({
+        "excel_data": base64.b64encode(excel_data).decode('utf-8'),
+        "filename": "All_Buddy_Registrations.xlsx",
+        "total_registrations": len(docs)
+    }).encode('utf-8')
+
+
+def cpu_ms(func, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        started = time.process_time()
+        func()
+        times.append(time.process_time() - started)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response compression size/CPU benchmark")
+    parser.add_argument('--sizes', default='10,100,1000', help="registration counts to build bodies for")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    docs = registration_documents(max(sizes))
+    levels = LEVELS if server.brotli else [level for level in LEVELS if level[0] == 'gzip']
+
+    results = []
+    print(f"{'body':<24}{'raw bytes':>12}{'encoding':>12}{'bytes':>12}{'ratio':>8}{'cpu ms':>9}")
+    for size in sizes:
+        for body_name, build in (('registrations', list_body), ('excel_download', excel_body)):
+            body = build(docs[:size])
+            label = f"{body_name}_{size}"
+            for encoding, level in levels:
+                compressed = server.compress_body(body, encoding, level)
+                row = {
+                    "body": label,
+                    "raw_bytes": len(body),
+                    "encoding": f"{encoding}-{level}",
+                    "bytes": len(compressed),
+                    "ratio": round(len(body) / len(compressed), 2),
+                    "cpu_ms": round(cpu_ms(lambda: server.compress_body(body, encoding, level), args.repeats), 2)
+                }
+                results.append(row)
+                print(f"{label:<24}{row['raw_bytes']:>12}{row['encoding']:>12}{row['bytes']:>12}"
+                      f"{row['ratio']:>8}{row['cpu_ms']:>9}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + '\n')
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
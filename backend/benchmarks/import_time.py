@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for server.py
+Imports the framework packages server.py builds on (FastAPI, Motor, pydantic...)
+and then server under `python -X importtime`, several times. Fails when one of the
+lazily loaded subsystems (mail, Excel, bcrypt) is imported at startup, or when the
+time server adds on top of its framework imports regresses past the stored
+baseline. That time is compared as a ratio of the framework import time, so a
+faster or slower machine moves both and the baseline holds across machines.
+
+Usage (from backend/):
+    python benchmarks/import_time.py [--runs 5] [--tolerance 0.5] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINES_FILE = Path(__file__).resolve().parent / 'baselines.json'
+
+# Modules server.py must only import on first use
+LAZY_MODULES = ['openpyxl', 'aiosmtplib', 'bcrypt', 'email.mime.multipart', 'email.mime.base']
+
+# Imported and timed before server, so the packages server.py builds on are not counted as its own time
+PROBE = """
+import json, time
+started = time.perf_counter()
+import fastapi, fastapi.responses, fastapi.exception_handlers, starlette.middleware.cors
+import motor.motor_asyncio, pymongo, bson, pydantic, email_validator, dotenv
+try:
+    import brotli
+except ImportError:
+    pass
+framework_done = time.perf_counter()
+import server
+finished = time.perf_counter()
+print(json.dumps({"framework_ms": (framework_done - started) * 1000, "server_ms": (finished - framework_done) * 1000}))
+"""
+
+
+def measure_import():
+    """One cold import: ({module imported by server: cumulative import time in microseconds},
+    framework ms, server ms)"""
+    env = dict(os.environ)
+    # server.py reads these at import time; nothing connects until the app starts
+    env.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    env.setdefault('DB_NAME', 'import_time_benchmark')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import server failed:\n{result.stderr[-2000:]}")
+
+    # importtime lists a module after the modules it imported, indented one level deeper
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        if name.strip() == 'server':
+            timings['server'] = int(cumulative_us)
+            break
+        if len(name) - len(name.lstrip()) == 1:
+            timings = {}
+        else:
+            timings[name.strip()] = int(cumulative_us)
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, measured['framework_ms'], measured['server_ms']
+
+
+def load_baselines():
+    if BASELINES_FILE.exists():
+        return json.loads(BASELINES_FILE.read_text())
+    return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time regression check for server.py")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="allowed slowdown over the baseline, as a fraction (0.5 = 50%%)")
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    runs = [measure_import() for _ in range(args.runs)]
+    framework_ms = statistics.median(framework for _, framework, _ in runs)
+    server_ms = statistics.median(server for _, _, server in runs)
+    ratio = statistics.median(server / framework for _, framework, server in runs)
+
+    print(f"framework imports (median of {args.runs}): {framework_ms:.1f} ms")
+    print(f"server on top of them (median of {args.runs}): {server_ms:.1f} ms, {ratio:.2f}x the framework time")
+    print("Heaviest imports by server in the last run:")
+    last_run = {name: us for name, us in runs[-1][0].items() if name != 'server'}
+    for name, us in sorted(last_run.items(), key=lambda item: item[1], reverse=True)[:10]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failures = [
+        f"{module} is imported at startup; import it inside the function that uses it"
+        for module in LAZY_MODULES if module in runs[-1][0]
+    ]
+
+    baselines = load_baselines()
+    if args.update_baseline:
+        # The milliseconds are for reference; only the ratio is checked
+        baselines['import_time'] = {
+            "framework_ms": round(framework_ms, 1),
+            "server_ms": round(server_ms, 1),
+            "server_to_framework_ratio": round(ratio, 3)
+        }
+        BASELINES_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f"Baseline updated in {BASELINES_FILE.name}")
+    elif 'server_to_framework_ratio' in baselines.get('import_time', {}):
+        baseline_ratio = baselines['import_time']['server_to_framework_ratio']
+        limit = baseline_ratio * (1 + args.tolerance)
+        print(f"baseline: {baseline_ratio:.2f}x, limit: {limit:.2f}x")
+        if ratio > limit:
+            failures.append(f"server import took {ratio:.2f}x the framework import time, over the {limit:.2f}x limit")
+    else:
+        print("No baseline recorded; run with --update-baseline")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
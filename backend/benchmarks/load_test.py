@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test for the registration API
+Drives a running server with a weighted mix of new submissions, resubmissions
+of an existing phone, list reads, admin edits and full Excel exports, then
+reports throughput and p50/p95/p99 latency per endpoint.
+
+Typical session (from backend/, against local MongoDB):
+    # 1. Seed synthetic registrations straight into MONGO_URL/DB_NAME
+    python benchmarks/load_test.py seed --count 100000 --reset
+
+    # 2. Start the server against a local SMTP sink with rate limits disabled
+    SMTP_HOST=127.0.0.1 SMTP_PORT=2525 SMTP_START_TLS=false \\
+    RATE_LIMIT_PASSWORD=0/60 RATE_LIMIT_ADMIN=0/60 RATE_LIMIT_SUBMISSION=0/60 \\
+    uvicorn server:app --port 8001
+
+    # 3. Run the load, hosting the SMTP sink in the same process
+    python benchmarks/load_test.py run --concurrency 50 --duration 60 --smtp-sink-port 2525
+
+The sink can also run on its own with `python benchmarks/load_test.py smtp-sink`.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+FIRST_NAMES = ['Asha', 'Ravi', 'Meera', 'Arjun', 'Kavya', 'Suresh', 'Lakshmi', 'Vikram', 'Priya', 'Anil']
+LAST_NAMES = ['Rao', 'Iyer', 'Nair', 'Reddy', 'Sharma', 'Menon', 'Gupta', 'Pillai', 'Das', 'Kumar']
+# Seeded registrations are recognised by this name prefix so --reset only removes them
+SYNTHETIC_NAME_PREFIX = 'Load Test'
+
+DEFAULT_MIX = 'submit=40,resubmit=15,list=30,admin_edit=12,export=3'
+
+
+# Synthetic data
+
+def synthetic_phone(index: int, prefix: str = '9') -> str:
+    return f"{prefix}{index:09d}"
+
+def synthetic_apartment(rng: random.Random) -> str:
+    return f"{rng.choice('ABCDEFGH')}-{rng.randint(1, 20)}{rng.randint(1, 12):02d}"
+
+def synthetic_person(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+def synthetic_registration(phone: str, rng: random.Random) -> dict:
+    """A RegistrationCreate-shaped payload for the given registrant phone"""
+    buddies = [
+        {
+            "name": synthetic_person(rng),
+            "phone": synthetic_phone(rng.randrange(10 ** 9), '7'),
+            "email": f"buddy{rng.randrange(10 ** 6)}@example.com",
+            "aptNumber": synthetic_apartment(rng)
+        }
+        for _ in range(rng.randint(1, 2))
+    ]
+    next_of_kin = [
+        {
+            "name": synthetic_person(rng),
+            "phone": synthetic_phone(rng.randrange(10 ** 9), '6'),
+            "email": f"kin{rng.randrange(10 ** 6)}@example.com",
+            "country": "INDIA",
+            "city": rng.choice(['Bangalore', 'Chennai', 'Mumbai', 'Delhi']),
+            "address": f"{rng.randint(1, 500)} Main Road"
+        }
+        for _ in range(rng.randint(1, 3))
+    ]
+    insured = rng.random() < 0.7
+    return {
+        "personalInfo": {
+            "registrantName": f"{SYNTHETIC_NAME_PREFIX} {synthetic_person(rng)}",
+            "registrantAptNumber": synthetic_apartment(rng),
+            "dateOfBirth": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1935, 2010)}",
+            "registrantPhone": phone,
+            "bloodGroup": rng.choice(BLOOD_GROUPS),
+            "insurancePolicy": f"POL{rng.randrange(10 ** 8):08d}" if insured else "",
+            "insuranceCompany": rng.choice(['Star Health', 'HDFC Ergo', 'Niva Bupa']) if insured else "",
+            "doctorName": f"Dr. {synthetic_person(rng)}",
+            "doctorContact": synthetic_phone(rng.randrange(10 ** 9), '8'),
+            "hospitalName": rng.choice(['Manipal', 'Apollo', 'Fortis', 'Narayana']),
+            "hospitalNumber": f"H{rng.randrange(10 ** 6):06d}",
+            "currentAilments": rng.choice(['', '', 'Diabetes', 'Hypertension', 'Asthma'])
+        },
+        "buddies": buddies,
+        "nextOfKin": next_of_kin
+    }
+
+
+async def seed(count: int, batch_size: int, reset: bool, rng_seed: int):
+    """Insert synthetic registrations directly, keeping changeSeq, contactKeys,
+    stats counters and the response cache consistent with what the API would write"""
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+    from pymongo import ReturnDocument
+
+    await server.connect_to_mongo()
+    await server.ensure_indexes()
+    rng = random.Random(rng_seed)
+
+    if reset:
+        result = await server.db.registrations.delete_many(
+            server.tenant_scoped({"personalInfo.registrantName": {"$regex": f"^{SYNTHETIC_NAME_PREFIX} "}})
+        )
+        print(f"Removed {result.deleted_count} synthetic registrations")
+
+    # Reserve a contiguous block of change sequence numbers in one round trip
+    counter = await server.db.counters.find_one_and_update(
+        {"_id": "registration_changes"},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    first_seq = counter['seq'] - count + 1
+
+    started = time.perf_counter()
+    for start in range(0, count, batch_size):
+        now = datetime.utcnow()
+        docs = []
+        for index in range(start, min(start + batch_size, count)):
+            doc = synthetic_registration(synthetic_phone(index), rng)
+            # Seeded into the default community, which requests without X-Tenant-ID use
+            doc['tenantId'] = server.DEFAULT_TENANT
+            doc['createdAt'] = now
+            doc['updatedAt'] = now
+            doc['changeSeq'] = first_seq + index
+            doc['contactKeys'] = server.contact_keys(doc['buddies'], doc['nextOfKin'])
+            doc.update(server.apartment_fields(doc['personalInfo']))
+            docs.append(doc)
+        await server.db.registrations.insert_many(docs, ordered=False)
+        print(f"\r{start + len(docs)}/{count} inserted", end='', flush=True)
+    print(f"\nSeeded {count} registrations in {time.perf_counter() - started:.1f}s")
+
+    await server.rebuild_registration_stats()
+    await server.invalidate_registration_cache()
+    server.client.close()
+
+
+# Local SMTP sink
+
+class SmtpSink:
+    """Accepts and discards mail, advertising AUTH so the server's login succeeds"""
+
+    def __init__(self):
+        self.messages = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.write(b"220 load-test-sink ESMTP\r\n")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode(errors='replace').split()
+                verb = parts[0].upper() if parts else ''
+                if verb == 'EHLO':
+                    writer.write(b"250-load-test-sink\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+                elif verb == 'AUTH':
+                    # Prompt for whatever the client did not send inline, then accept
+                    prompts = {'PLAIN': 1, 'LOGIN': 2}.get(parts[1].upper(), 0) - (len(parts) - 2)
+                    for _ in range(max(prompts, 0)):
+                        writer.write(b"334 \r\n")
+                        await writer.drain()
+                        await reader.readline()
+                    writer.write(b"235 Authentication successful\r\n")
+                elif verb == 'DATA':
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    await writer.drain()
+                    while (await reader.readline()) not in (b".\r\n", b""):
+                        pass
+                    self.messages += 1
+                    writer.write(b"250 Queued\r\n")
+                elif verb == 'QUIT':
+                    writer.write(b"221 Bye\r\n")
+                    break
+                else:
+                    writer.write(b"250 OK\r\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host: str, port: int):
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def run_smtp_sink(host: str, port: int):
+    sink = SmtpSink()
+    smtp_server = await sink.start(host, port)
+    print(f"SMTP sink listening on {host}:{port}")
+    async with smtp_server:
+        try:
+            while True:
+                await asyncio.sleep(10)
+                print(f"{sink.messages} messages received")
+        except asyncio.CancelledError:
+            pass
+
+
+# Load run
+
+class LoadState:
+    """Shared between workers: known registrations, admin token and results"""
+
+    def __init__(self, args, rng: random.Random):
+        self.args = args
+        self.rng = rng
+        self.token = None
+        self.known = []  # (registration id, registrant phone)
+        # New submissions use '8'-prefixed phones offset by the start time so runs do not collide
+        self.next_new_phone = int(time.time()) % 10000 * 100000
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.failures = Counter()
+
+    def new_phone(self) -> str:
+        self.next_new_phone += 1
+        return synthetic_phone(self.next_new_phone, '8')
+
+    def existing_phone(self) -> str:
+        if self.known and self.rng.random() < 0.5:
+            return self.rng.choice(self.known)[1]
+        return synthetic_phone(self.rng.randrange(max(self.args.seeded, 1)))
+
+    def remember(self, response: httpx.Response):
+        if response.status_code == 200:
+            data = response.json()
+            self.known.append((data['id'], data['personalInfo']['registrantPhone']))
+
+    def admin_headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+async def scenario_submit(client: httpx.AsyncClient, state: LoadState):
+    response = await client.post('/registrations', json=synthetic_registration(state.new_phone(), state.rng))
+    state.remember(response)
+    return response
+
+async def scenario_resubmit(client: httpx.AsyncClient, state: LoadState):
+    return await client.post('/registrations', json=synthetic_registration(state.existing_phone(), state.rng))
+
+async def scenario_list(client: httpx.AsyncClient, state: LoadState):
+    return await client.get('/registrations')
+
+async def scenario_admin_edit(client: httpx.AsyncClient, state: LoadState):
+    if not state.known:
+        return await scenario_list(client, state)
+    registration_id, phone = state.rng.choice(state.known)
+    return await client.put(
+        f'/registrations/{registration_id}',
+        json=synthetic_registration(phone, state.rng),
+        headers=state.admin_headers()
+    )
+
+async def scenario_export(client: httpx.AsyncClient, state: LoadState):
+    return await client.post('/admin/download-all-excel', json={}, headers=state.admin_headers())
+
+SCENARIOS = {
+    'submit': ('POST /registrations (new)', scenario_submit),
+    'resubmit': ('POST /registrations (same phone)', scenario_resubmit),
+    'list': ('GET /registrations', scenario_list),
+    'admin_edit': ('PUT /registrations/{id}', scenario_admin_edit),
+    'export': ('POST /admin/download-all-excel', scenario_export),
+}
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(','):
+        name, weight = part.split('=')
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'; choose from {', '.join(SCENARIOS)}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+async def prepare(client: httpx.AsyncClient, state: LoadState):
+    """Obtain an admin session token (registering an admin if there is none) and
+    collect existing registration ids for admin edits"""
+    password = state.args.admin_password
+    response = await client.post('/admin/verify-password', json={"password": password})
+    if response.status_code == 404:
+        await client.post('/admin/register', json={
+            "name": "Load Test Admin", "phone": "9999999999",
+            "email": "load-test-admin@example.com", "password": password
+        })
+        response = await client.post('/admin/verify-password', json={"password": password})
+    if response.status_code != 200:
+        raise SystemExit(f"Could not verify the admin password: HTTP {response.status_code} {response.text}")
+    state.token = response.json()['token']
+
+    response = await client.get('/registrations')
+    response.raise_for_status()
+    state.known = [(reg['id'], reg['personalInfo']['registrantPhone']) for reg in response.json()]
+
+
+async def worker(client: httpx.AsyncClient, state: LoadState, names: list, weights: list, deadline: float, budget: list):
+    while time.monotonic() < deadline and budget[0] != 0:
+        budget[0] -= 1
+        name = state.rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await SCENARIOS[name][1](client, state)
+            state.statuses[name][response.status_code] += 1
+        except httpx.HTTPError as e:
+            state.failures[name] += 1
+            state.statuses[name][type(e).__name__] += 1
+        state.latencies[name].append(time.perf_counter() - started)
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(state: LoadState, elapsed: float) -> dict:
+    summary = {"elapsed_seconds": round(elapsed, 2), "endpoints": {}}
+    for name, latencies in state.latencies.items():
+        latencies.sort()
+        ok = sum(count for status, count in state.statuses[name].items() if isinstance(status, int) and status < 400)
+        summary["endpoints"][SCENARIOS[name][0]] = {
+            "requests": len(latencies),
+            "ok": ok,
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "statuses": {str(status): count for status, count in state.statuses[name].items()}
+        }
+    total = sum(len(latencies) for latencies in state.latencies.values())
+    summary["total_requests"] = total
+    summary["throughput_rps"] = round(total / elapsed, 2)
+    return summary
+
+
+def print_summary(summary: dict):
+    print(f"\n{summary['total_requests']} requests in {summary['elapsed_seconds']}s "
+          f"({summary['throughput_rps']} req/s)\n")
+    print(f"{'endpoint':<36}{'reqs':>8}{'ok':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+    for endpoint, row in summary['endpoints'].items():
+        statuses = ' '.join(f"{status}x{count}" for status, count in sorted(row['statuses'].items()))
+        print(f"{endpoint:<36}{row['requests']:>8}{row['ok']:>8}{row['throughput_rps']:>9}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}  {statuses}")
+
+
+async def run(args):
+    mix = parse_mix(args.mix)
+    state = LoadState(args, random.Random(args.seed))
+
+    smtp_server = None
+    sink = SmtpSink()
+    if args.smtp_sink_port:
+        smtp_server = await sink.start('127.0.0.1', args.smtp_sink_port)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url.rstrip('/') + '/api', limits=limits, timeout=args.timeout) as client:
+        await prepare(client, state)
+        print(f"Running {args.concurrency} workers for up to {args.duration}s "
+              f"({len(state.known)} known registrations, mix {args.mix})")
+        budget = [args.requests or -1]
+        started = time.perf_counter()
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(*[
+            worker(client, state, list(mix), list(mix.values()), deadline, budget)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    summary = summarize(state, elapsed)
+    if smtp_server:
+        smtp_server.close()
+        summary["smtp_messages"] = sink.messages
+    print_summary(summary)
+    if smtp_server:
+        print(f"\nSMTP sink received {sink.messages} messages")
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2) + '\n')
+        print(f"Summary written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the registration API")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help="insert synthetic registrations into MongoDB")
+    seed_parser.add_argument('--count', type=int, default=100000)
+    seed_parser.add_argument('--batch-size', type=int, default=1000)
+    seed_parser.add_argument('--reset', action='store_true', help="remove previously seeded registrations first")
+    seed_parser.add_argument('--seed', type=int, default=42)
+
+    sink_parser = commands.add_parser('smtp-sink', help="run a local SMTP server that discards mail")
+    sink_parser.add_argument('--host', default='127.0.0.1')
+    sink_parser.add_argument('--port', type=int, default=2525)
+
+    run_parser = commands.add_parser('run', help="drive a running server with a concurrent request mix")
+    run_parser.add_argument('--base-url', default='http://localhost:8001')
+    run_parser.add_argument('--concurrency', type=int, default=20)
+    run_parser.add_argument('--duration', type=float, default=60, help="seconds")
+    run_parser.add_argument('--requests', type=int, default=0, help="stop after this many requests (0 = no limit)")
+    run_parser.add_argument('--mix', default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    run_parser.add_argument('--seeded', type=int, default=100000, help="registrations created by the seed command")
+    run_parser.add_argument('--admin-password', default='load-test')
+    run_parser.add_argument('--smtp-sink-port', type=int, default=0, help="host the SMTP sink on this port")
+    run_parser.add_argument('--timeout', type=float, default=120)
+    run_parser.add_argument('--seed', type=int, default=None)
+    run_parser.add_argument('--output', help="write the JSON summary to this file")
+
+    args = parser.parse_args()
+    if args.command == 'seed':
+        asyncio.run(seed(args.count, args.batch_size, args.reset, args.seed))
+    elif args.command == 'smtp-sink':
+        try:
+            asyncio.run(run_smtp_sink(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the CPU hot spots in server.py
+Times Excel export at 1/1k/10k/50k rows, notification email rendering,
+calculate_age and RegistrationResponse list serialization, and fails when a
+case regresses past its baseline in baselines.json. Each case runs in its own
+process so its peak memory is the growth of the process's max RSS. Baselines
+are machine specific; record them on the machine that runs the gate.
+
+Usage (from backend/):
+    python benchmarks/micro.py [--cases excel] [--tolerance 0.5] [--memory-tolerance 0.25] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINES_FILE = Path(__file__).resolve().parent / 'baselines.json'
+
+# server.py reads these at import time; nothing connects to MongoDB here
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'micro_benchmark')
+sys.path.insert(0, str(BACKEND_DIR))
+
+import server
+
+EMAIL_RENDERS = 200
+AGE_CALLS = 10000
+# Peak memory below this many MB over the baseline is treated as noise
+MEMORY_SLACK_MB = 2
+
+
+def registration_documents(count: int) -> list:
+    """Synthetic documents shaped like db.registrations rows"""
+    from bson import ObjectId
+    from load_test import synthetic_phone, synthetic_registration
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    docs = []
+    for index in range(count):
+        doc = synthetic_registration(synthetic_phone(index), rng)
+        doc.update(_id=ObjectId(), createdAt=now, updatedAt=now)
+        docs.append(doc)
+    return docs
+
+
+def excel(docs):
+    server.create_excel_from_registrations(docs)
+
+def serialize(docs):
+    server.registration_list_adapter.dump_json([server.registration_to_response(doc) for doc in docs])
+
+def render_emails(docs):
+    for doc in docs:
+        server.render_registration_email(doc)
+
+def ages(docs):
+    for doc in docs:
+        server.calculate_age(doc['personalInfo']['dateOfBirth'])
+
+# name -> (function of the documents, number of documents, timed repeats);
+# large cases run once to keep the suite short
+CASES = {
+    'excel_1_row': (excel, 1, 20),
+    'excel_1k_rows': (excel, 1000, 5),
+    'excel_10k_rows': (excel, 10000, 1),
+    'excel_50k_rows': (excel, 50000, 1),
+    f'email_render_x{EMAIL_RENDERS}': (render_emails, EMAIL_RENDERS, 5),
+    f'calculate_age_x{AGE_CALLS}': (ages, AGE_CALLS, 5),
+    'serialize_1k_registrations': (serialize, 1000, 5),
+    'serialize_10k_registrations': (serialize, 10000, 3),
+}
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def run_case(name: str) -> dict:
+    """Median wall time over the repeats and growth of peak RSS while the case ran"""
+    func, count, repeats = CASES[name]
+    docs = registration_documents(count)
+    # Load lazily imported modules (openpyxl) before the memory baseline is taken
+    func(docs[:1])
+    rss_before = max_rss_mb()
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(docs)
+        times.append(time.perf_counter() - started)
+    return {"seconds": round(statistics.median(times), 5), "peak_mb": round(max_rss_mb() - rss_before, 2)}
+
+
+def measure(name: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, __file__, '--run-case', name],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def load_baselines():
+    if BASELINES_FILE.exists():
+        return json.loads(BASELINES_FILE.read_text())
+    return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark regression check for server.py hot spots")
+    parser.add_argument('--cases', help="only run cases whose name contains this text")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="allowed slowdown over the baseline, as a fraction (0.5 = 50%%)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25,
+                        help="allowed peak memory growth over the baseline, as a fraction")
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case)))
+        return 0
+
+    cases = [name for name in CASES if not args.cases or args.cases in name]
+    baselines = load_baselines()
+    micro_baselines = baselines.get('micro', {})
+
+    failures = []
+    results = {}
+    print(f"{'case':<30}{'seconds':>10}{'peak MB':>10}{'base s':>10}{'base MB':>10}")
+    for name in cases:
+        result = results[name] = measure(name)
+        baseline = micro_baselines.get(name)
+        print(f"{name:<30}{result['seconds']:>10.4f}{result['peak_mb']:>10.2f}"
+              f"{baseline['seconds'] if baseline else '-':>10}{baseline['peak_mb'] if baseline else '-':>10}")
+        if not baseline or args.update_baseline:
+            continue
+        if result['seconds'] > baseline['seconds'] * (1 + args.tolerance):
+            failures.append(f"{name} took {result['seconds']:.4f}s, baseline {baseline['seconds']:.4f}s")
+        if result['peak_mb'] > baseline['peak_mb'] * (1 + args.memory_tolerance) + MEMORY_SLACK_MB:
+            failures.append(f"{name} peaked at {result['peak_mb']:.2f} MB, baseline {baseline['peak_mb']:.2f} MB")
+
+    if args.update_baseline:
+        baselines['micro'] = {**micro_baselines, **results}
+        BASELINES_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f"Baseline updated in {BASELINES_FILE.name}")
+    elif not micro_baselines:
+        print("No baseline recorded; run with --update-baseline")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
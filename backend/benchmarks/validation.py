@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Validation throughput of admin registration updates (PUT /api/registrations/{id})
+Compares the previous handling, which parsed personalInfo, buddies and
+nextOfKin into raw dicts, validated them by hand with throwaway PersonalInfo,
+Buddy and NextOfKin models and built those models a third time for the
+response, with the typed AdminRegistrationUpdateRequest that is parsed once
+and reused for the response. Reports payloads per second for both paths.
+
+Usage (from backend/):
+    python benchmarks/validation.py [--count 10000] [--repeats 5] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# server.py reads these at import time; nothing connects to MongoDB here
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'validation_benchmark')
+sys.path.insert(0, str(BACKEND_DIR))
+
+import server
+from load_test import synthetic_phone, synthetic_registration
+
+REGISTRATION_ID = '0123456789abcdef01234567'
+
+
+class UntypedUpdateRequest(BaseModel):
+    """AdminRegistrationUpdateRequest as it was before its fields were typed"""
+    password: Optional[str] = None
+    personalInfo: dict
+    buddies: List[dict]
+    nextOfKin: List[dict]
+
+
+def untyped_update(payload: dict, created_at: datetime) -> server.RegistrationResponse:
+    """Request parsing, hand validation, update document and response of the previous handler"""
+    request = UntypedUpdateRequest(**payload)
+    server.PersonalInfo(**request.personalInfo)
+    if len(request.buddies) < 1 or len(request.buddies) > 2:
+        raise ValueError("Exactly 1-2 buddies are required")
+    for buddy in request.buddies:
+        server.Buddy(**buddy)
+    if len(request.nextOfKin) < 1 or len(request.nextOfKin) > 3:
+        raise ValueError("1-3 next of kin contacts are required")
+    for kin in request.nextOfKin:
+        server.NextOfKin(**kin)
+    server.contact_keys(request.buddies, request.nextOfKin)
+    return server.registration_to_response({
+        '_id': REGISTRATION_ID,
+        'personalInfo': request.personalInfo,
+        'buddies': request.buddies,
+        'nextOfKin': request.nextOfKin,
+        'createdAt': created_at
+    })
+
+
+def typed_update(payload: dict, created_at: datetime) -> server.RegistrationResponse:
+    """The same steps in update_registration_admin with the typed request model"""
+    request = server.AdminRegistrationUpdateRequest(**payload)
+    registration_parts = request.model_dump(exclude={'password'})
+    server.contact_keys(registration_parts['buddies'], registration_parts['nextOfKin'])
+    return server.RegistrationResponse(
+        id=REGISTRATION_ID,
+        personalInfo=request.personalInfo,
+        buddies=request.buddies,
+        nextOfKin=request.nextOfKin,
+        createdAt=created_at
+    )
+
+
+PATHS = {'untyped_dicts': untyped_update, 'typed_models': typed_update}
+
+
+def update_payloads(count: int) -> list:
+    rng = random.Random(11)
+    return [{**synthetic_registration(synthetic_phone(index), rng), 'password': 'benchmark'} for index in range(count)]
+
+
+def seconds_per_pass(func, payloads: list, created_at: datetime, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for payload in payloads:
+            func(payload, created_at)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Admin registration update validation throughput")
+    parser.add_argument('--count', type=int, default=10000, help="update payloads per timed pass")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    payloads = update_payloads(args.count)
+    created_at = datetime.utcnow()
+
+    # Both paths must accept the same payloads and answer with the same response
+    for payload in payloads[:100]:
+        if untyped_update(payload, created_at) != typed_update(payload, created_at):
+            raise SystemExit("The two paths disagree; the benchmark is not comparing like with like")
+
+    results = {}
+    print(f"{'path':<16}{'seconds':>10}{'payloads/s':>14}")
+    for name, func in PATHS.items():
+        func(payloads[0], created_at)
+        seconds = seconds_per_pass(func, payloads, created_at, args.repeats)
+        results[name] = {"seconds": round(seconds, 5), "payloads_per_second": round(args.count / seconds)}
+        print(f"{name:<16}{seconds:>10.4f}{results[name]['payloads_per_second']:>14}")
+
+    speedup = results['untyped_dicts']['seconds'] / results['typed_models']['seconds']
+    print(f"typed_models is {speedup:.2f}x the throughput of untyped_dicts")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"count": args.count, "paths": results, "speedup": round(speedup, 2)}, indent=2) + '\n')
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Production entry point: N uvicorn worker processes on uvloop and httptools
+On SIGTERM/SIGINT each worker stops accepting connections, lets in-flight
+requests finish for up to --graceful-timeout seconds, then runs the app's
+shutdown (closing the bcrypt pool and the MongoDB client).
+
+Usage (from backend/):
+    python run.py [--workers 4] [--host 0.0.0.0] [--port 8001] [--graceful-timeout 30]
+
+Workers share state only through MongoDB: the response and admin caches are
+versioned in db.cache_versions, change sequence numbers and stats counters are
+$inc'd documents, session tokens are signed with a secret from db.settings, and
+with more than one worker rate limit buckets default to db.rate_limits
+(RATE_LIMIT_STORE=mongo). Emails are sent by the request that triggered them,
+so adding workers never sends one twice.
+"""
+
+import argparse
+import logging
+import os
+
+import uvicorn
+
+logger = logging.getLogger('run')
+
+
+def available(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with multiple worker processes")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '8001')))
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.environ.get('GRACEFUL_SHUTDOWN_TIMEOUT', '30')),
+                        help="seconds to let in-flight requests finish on shutdown")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.workers > 1:
+        # Inherited by the worker processes; per-process buckets would multiply every limit by the worker count
+        os.environ.setdefault('RATE_LIMIT_STORE', 'mongo')
+        if os.environ.get('REGISTRATION_FEED_SOURCE', 'handlers') == 'handlers':
+            logger.warning(
+                "REGISTRATION_FEED_SOURCE=handlers only streams changes made through the same worker; "
+                "use REGISTRATION_FEED_SOURCE=changestream (needs a replica set) with several workers"
+            )
+
+    loop = 'uvloop' if available('uvloop') else 'asyncio'
+    http = 'httptools' if available('httptools') else 'h11'
+    logger.info(f"Starting {args.workers} workers on {args.host}:{args.port} (loop={loop}, http={http})")
+
+    uvicorn.run(
+        'server:app',
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        app_dir=os.path.dirname(os.path.abspath(__file__))
+    )
+
+
+if __name__ == '__main__':
+    main()
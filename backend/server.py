@@ -1,36 +1,546 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Response, Request, Header, UploadFile, File, Form, Depends
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import OrderedDict
 from bson import ObjectId
-import aiosmtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-import bcrypt
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.monitoring import ConnectionPoolListener, CommandListener
 import io
 import base64
+import time
+import json
+import asyncio
+import re
+import math
+import hmac
+import hashlib
+import secrets
+import functools
+import gzip
+import threading
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# Metrics in the Prometheus text format, kept in process and served from /metrics
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class Histogram:
+    """Minimal Prometheus histogram; label values are passed positionally in label_names order.
+    pymongo's monitors observe from its own threads, so series are updated under a lock."""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            # Copy so each series' buckets, sum and count are from the same moment
+            snapshot = [(label_values, {**series, 'buckets': list(series['buckets'])})
+                        for label_values, series in self._series.items()]
+        for label_values, series in snapshot:
+            labels = ''.join(
+                f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}",'
+                for name, value in zip(self.label_names, label_values)
+            )
+            for bound, count in zip(self.buckets, series['buckets']):
+                lines.append(f'{self.name}_bucket{{{labels}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}le="+Inf"}} {series["count"]}')
+            series_labels = f'{{{labels.rstrip(",")}}}' if labels else ''
+            lines.append(f'{self.name}_sum{series_labels} {series["sum"]}')
+            lines.append(f'{self.name}_count{series_labels} {series["count"]}')
+        return lines
+
+def render_gauge(name: str, help_text: str, value: float) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template', ('method', 'route', 'status')
+)
+mongo_operation_duration = Histogram(
+    'mongo_operation_duration_seconds', 'MongoDB command latency', ('command', 'outcome')
+)
+smtp_send_duration = Histogram(
+    'smtp_send_duration_seconds', 'SMTP send latency and outcome', ('outcome',)
+)
+excel_export_duration = Histogram(
+    'excel_export_duration_seconds', 'Time spent in create_excel_from_registrations'
+)
+excel_export_bytes = Histogram(
+    'excel_export_bytes', 'Size of generated Excel workbooks',
+    buckets=(10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000, 50_000_000)
+)
+# Emails are sent inline by the request that triggered them, so there is no separate queue to count
+smtp_sends_in_flight = 0
+
+class MongoCommandMonitor(CommandListener):
+    """Feeds mongo_operation_duration from pymongo command events"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_operation_duration.observe(event.duration_micros / 1e6, event.command_name, 'success')
+
+    def failed(self, event):
+        mongo_operation_duration.observe(event.duration_micros / 1e6, event.command_name, 'failure')
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        status = [500]
+        
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Label by template (/api/registrations/{registration_id}) to keep cardinality bounded
+            route = scope.get('route')
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                scope['method'],
+                route.path if route else 'unmatched',
+                str(status[0])
+            )
+
+# Request tracing: spans are shown in the Server-Timing header and, when
+# TRACE_EXPORT_FILE is set, appended to it as OTLP JSON (one trace per line)
+TRACE_EXPORT_FILE = os.environ.get('TRACE_EXPORT_FILE')
+TRACE_SERVICE_NAME = os.environ.get('TRACE_SERVICE_NAME', 'health-registration-api')
+
+current_trace = ContextVar('current_trace', default=None)
+current_span_id = ContextVar('current_span_id', default=None)
+trace_export_lock = threading.Lock()
+
+def otlp_attributes(attributes: dict) -> List[dict]:
+    return [
+        {"key": key, "value": {"intValue": str(value)} if isinstance(value, int) and not isinstance(value, bool)
+                              else {"stringValue": str(value)}}
+        for key, value in attributes.items()
+    ]
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a step of the current request as a child of the enclosing span; no-op outside a request"""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    
+    span_id = secrets.token_hex(8)
+    record = {
+        "traceId": trace['trace_id'],
+        "spanId": span_id,
+        "parentSpanId": current_span_id.get() or '',
+        "name": name,
+        "kind": 'SPAN_KIND_INTERNAL',
+        "startTimeUnixNano": str(time.time_ns()),
+        "attributes": otlp_attributes(attributes),
+        "status": {}
+    }
+    started = time.perf_counter()
+    token = current_span_id.set(span_id)
+    try:
+        yield
+    except Exception as e:
+        record['status'] = {"code": 'STATUS_CODE_ERROR', "message": str(e)}
+        raise
+    finally:
+        current_span_id.reset(token)
+        record['endTimeUnixNano'] = str(time.time_ns())
+        trace['spans'].append(record)
+        trace['timings'].append((name, (time.perf_counter() - started) * 1000))
+
+def server_timing_header(timings: List[tuple], total_ms: float) -> str:
+    entries = [f"{name};dur={duration:.1f}" for name, duration in timings]
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ', '.join(entries)
+
+def export_trace(spans: List[dict]):
+    line = json.dumps({"resourceSpans": [{
+        "resource": {"attributes": otlp_attributes({"service.name": TRACE_SERVICE_NAME})},
+        "scopeSpans": [{"scope": {"name": 'server'}, "spans": spans}]
+    }]})
+    with trace_export_lock, open(TRACE_EXPORT_FILE, 'a') as trace_file:
+        trace_file.write(line + '\n')
+
+class TracingMiddleware:
+    """ASGI middleware opening a root span per request and reporting its child spans"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] == '/metrics':
+            await self.app(scope, receive, send)
+            return
+        
+        trace = {"trace_id": secrets.token_hex(16), "spans": [], "timings": []}
+        root_span_id = secrets.token_hex(8)
+        start_ns = time.time_ns()
+        started = time.perf_counter()
+        status = [500]
+        
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+                # Only spans finished before the response starts can be reported
+                header = server_timing_header(trace['timings'], (time.perf_counter() - started) * 1000)
+                message['headers'] = list(message.get('headers', [])) + [(b'server-timing', header.encode())]
+            await send(message)
+        
+        trace_token = current_trace.set(trace)
+        span_token = current_span_id.set(root_span_id)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_span_id.reset(span_token)
+            current_trace.reset(trace_token)
+        
+        if TRACE_EXPORT_FILE:
+            route = scope.get('route')
+            route_path = route.path if route else scope['path']
+            root = {
+                "traceId": trace['trace_id'],
+                "spanId": root_span_id,
+                "parentSpanId": '',
+                "name": f"{scope['method']} {route_path}",
+                "kind": 'SPAN_KIND_SERVER',
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(time.time_ns()),
+                "attributes": otlp_attributes({
+                    "http.request.method": scope['method'],
+                    "http.route": route_path,
+                    "http.response.status_code": status[0]
+                }),
+                "status": {"code": 'STATUS_CODE_ERROR'} if status[0] >= 500 else {}
+            }
+            try:
+                await asyncio.to_thread(export_trace, [root] + trace['spans'])
+            except OSError as e:
+                logger.error(f"Failed to export trace: {str(e)}")
+
+# Response compression, negotiated from Accept-Encoding
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_COMPRESSION_LEVEL = int(os.environ.get('GZIP_COMPRESSION_LEVEL', '6'))
+BROTLI_COMPRESSION_LEVEL = int(os.environ.get('BROTLI_COMPRESSION_LEVEL', '4'))
+# Bodies above this size are compressed on a worker thread instead of the event loop
+COMPRESSION_THREAD_SIZE = int(os.environ.get('COMPRESSION_THREAD_SIZE', '262144'))
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/xml')
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Preferred supported encoding from an Accept-Encoding header, brotli first on ties"""
+    weights = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        try:
+            weight = float(params.strip()[2:]) if params.strip().startswith('q=') else 1.0
+        except ValueError:
+            weight = 0.0
+        weights[coding.strip()] = weight
+    
+    supported = ['br', 'gzip'] if brotli else ['gzip']
+    candidates = [(weights.get(coding, weights.get('*', 0.0)), coding) for coding in supported]
+    weight, coding = max(candidates, key=lambda candidate: candidate[0])
+    return coding if weight > 0 else None
+
+def compress_body(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_COMPRESSION_LEVEL if level is None else level)
+    return gzip.compress(body, compresslevel=GZIP_COMPRESSION_LEVEL if level is None else level)
+
+async def compress_body_off_loop(body: bytes, encoding: str) -> bytes:
+    if len(body) >= COMPRESSION_THREAD_SIZE:
+        return await asyncio.to_thread(compress_body, body, encoding)
+    return compress_body(body, encoding)
+
+async def cached_json_response(request: Request, variants: dict) -> Response:
+    """Response for a cached JSON body. variants maps encodings to the body compressed with them,
+    the raw body under 'identity'; each encoding is compressed on its first hit and kept with the
+    cached entry, so later hits skip the compression middleware's work."""
+    body = variants['identity']
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return Response(content=body, media_type="application/json")
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get('accept-encoding', ''))
+    if encoding is None:
+        return Response(content=body, media_type="application/json", headers=headers)
+    if encoding not in variants:
+        variants[encoding] = await compress_body_off_loop(body, encoding)
+    headers['Content-Encoding'] = encoding
+    return Response(content=variants[encoding], media_type="application/json", headers=headers)
+
+class CompressionMiddleware:
+    """ASGI middleware compressing single-message text/JSON responses above COMPRESSION_MIN_SIZE.
+    Streamed responses (the SSE feed) pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        
+        start_message = None
+        passthrough = False
+        
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message['type'] == 'http.response.start':
+                # Held back until the body shows whether compression applies
+                start_message = message
+                return
+            
+            headers = MutableHeaders(raw=start_message['headers'])
+            body = message.get('body', b'')
+            if (message.get('more_body', False) or 'content-encoding' in headers
+                    or len(body) < COMPRESSION_MIN_SIZE
+                    or not headers.get('content-type', '').startswith(COMPRESSIBLE_TYPES)):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+            
+            # Compressed or not, this body now depends on Accept-Encoding, so shared caches must key on it
+            if 'accept-encoding' not in headers.get('vary', '').lower():
+                headers.add_vary_header('Accept-Encoding')
+            if encoding is None:
+                await send(start_message)
+                await send(message)
+                return
+            
+            body = await compress_body_off_loop(body, encoding)
+            headers['Content-Encoding'] = encoding
+            headers['Content-Length'] = str(len(body))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+        
+        await self.app(scope, receive, send_compressed)
+
+# Multi-community tenancy: every request acts for one residential society, named by the
+# X-Tenant-ID header (or ?tenant= for EventSource clients, which cannot set headers).
+# Requests without one belong to DEFAULT_TENANT, which also owns documents written before tenancy.
+DEFAULT_TENANT = os.environ.get('DEFAULT_TENANT', 'default')
+# Comma separated allow-list; when empty any well-formed tenant id is accepted
+ALLOWED_TENANTS = {tenant.strip() for tenant in os.environ.get('TENANTS', '').split(',') if tenant.strip()}
+TENANT_ID_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+# Per-tenant read caches are kept for at most this many recently active tenants
+TENANT_CACHE_MAX_TENANTS = int(os.environ.get('TENANT_CACHE_MAX_TENANTS', '200'))
+
+current_tenant = ContextVar('current_tenant', default=DEFAULT_TENANT)
+
+def tenant_scoped(query: Optional[dict] = None) -> dict:
+    """A MongoDB filter restricted to the current tenant's documents"""
+    return {"tenantId": current_tenant.get(), **(query or {})}
+
+def tenant_doc_id(name: str) -> str:
+    """_id of a per-tenant singleton document; the default tenant keeps the pre-tenancy ids"""
+    tenant = current_tenant.get()
+    return name if tenant == DEFAULT_TENANT else f"{tenant}:{name}"
+
+def resolve_tenant(scope) -> str:
+    tenant = Headers(scope=scope).get('x-tenant-id')
+    if tenant is None:
+        tenant = Request(scope).query_params.get('tenant')
+    return (tenant or DEFAULT_TENANT).strip().lower()
+
+class TenantMiddleware:
+    """ASGI middleware binding each request to its tenant through current_tenant"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        tenant = resolve_tenant(scope)
+        if not TENANT_ID_PATTERN.match(tenant):
+            await JSONResponse(status_code=400, content={"detail": "Invalid tenant id"})(scope, receive, send)
+            return
+        if ALLOWED_TENANTS and tenant not in ALLOWED_TENANTS and tenant != DEFAULT_TENANT:
+            await JSONResponse(status_code=404, content={"detail": "Unknown tenant"})(scope, receive, send)
+            return
+        
+        token = current_tenant.set(tenant)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+
+# MongoDB connection, created and warmed by the lifespan handler
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '5'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '20000'))
+
+client = None
+db = None
+
+class MongoPoolMonitor(ConnectionPoolListener):
+    """Counts open and checked-out connections for the health endpoint.
+    Events arrive on pymongo's threads, so the counters are updated under a lock."""
+
+    def __init__(self):
+        self.open = 0
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.in_use += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+mongo_pool_monitor = MongoPoolMonitor()
+
+async def connect_to_mongo():
+    global client, db
+    client = AsyncIOMotorClient(
+        mongo_url,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        event_listeners=[mongo_pool_monitor, MongoCommandMonitor()]
+    )
+    db = client[os.environ['DB_NAME']]
+    try:
+        # Concurrent pings open the minimum pool before the first request arrives
+        await asyncio.gather(*[db.command('ping') for _ in range(max(1, MONGO_MIN_POOL_SIZE))])
+        logger.info(f"MongoDB connected with {mongo_pool_monitor.open} warm connections")
+    except Exception as e:
+        # Keep starting; /api/health reports unavailable until Mongo answers
+        logger.error(f"MongoDB is not reachable at startup: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_to_mongo()
+    try:
+        # Every query is tenant scoped, so documents from before tenancy are given to DEFAULT_TENANT
+        await backfill_tenant_ids()
+    except Exception as e:
+        logger.error(f"Error backfilling tenantId: {str(e)}")
+    await ensure_indexes()
+    try:
+        # Incremental exports scan updatedAt only, so legacy registrations need it set
+        await backfill_updated_at()
+    except Exception as e:
+        logger.error(f"Error backfilling updatedAt: {str(e)}")
+    try:
+        # Contact lookups and replacements match on contactKeys, so legacy registrations need it set
+        await backfill_contact_keys()
+    except Exception as e:
+        logger.error(f"Error backfilling contactKeys: {str(e)}")
+    try:
+        # The donor search filters and sorts on aptBlock/aptUnit, so legacy registrations need them set
+        await backfill_apartment_fields()
+    except Exception as e:
+        logger.error(f"Error backfilling aptBlock/aptUnit: {str(e)}")
+    registration_watcher = None
+    if REGISTRATION_FEED_SOURCE == 'changestream':
+        registration_watcher = asyncio.create_task(watch_registration_changes())
+    
+    yield
+    
+    if registration_watcher:
+        registration_watcher.cancel()
+    bcrypt_executor.shutdown(wait=False)
+    client.close()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -39,156 +549,246 @@ api_router = APIRouter(prefix="/api")
 # Email configuration
 GMAIL_EMAIL = os.environ.get('GMAIL_EMAIL')
 GMAIL_PASSWORD = os.environ.get('GMAIL_PASSWORD')
+# Point these at a local SMTP sink for load tests
+SMTP_HOST = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+SMTP_START_TLS = os.environ.get('SMTP_START_TLS', 'true').lower() == 'true'
+
+# bcrypt takes hundreds of milliseconds per call, so it runs on its own bounded pool instead of the event loop
+BCRYPT_MAX_WORKERS = int(os.environ.get('BCRYPT_MAX_WORKERS', '2'))
+
+# Admin session tokens
+ADMIN_SESSION_SECRET = os.environ.get('ADMIN_SESSION_SECRET')
+ADMIN_SESSION_TTL_MINUTES = int(os.environ.get('ADMIN_SESSION_TTL_MINUTES', '30'))
+
+# Rate limits per client as "<requests>/<seconds>"; a limit of 0 requests disables it
+RATE_LIMIT_PASSWORD = os.environ.get('RATE_LIMIT_PASSWORD', '5/60')
+RATE_LIMIT_ADMIN = os.environ.get('RATE_LIMIT_ADMIN', '60/60')
+RATE_LIMIT_SUBMISSION = os.environ.get('RATE_LIMIT_SUBMISSION', '10/60')
+# Addresses or networks of the proxies in front of the app, e.g. "10.0.0.0/8,127.0.0.1". Requests from
+# them are limited by the client address in X-Forwarded-For; without it every client behind an ingress
+# shares the ingress's bucket. Requests from anywhere else cannot pick their key by sending the header.
+RATE_LIMIT_TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', '').split(',') if proxy.strip()
+]
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', '10000'))
+# 'mongo' keeps buckets in db.rate_limits so every worker process draws from the same one
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'memory')
+
+# Read cache configuration
+REGISTRATION_CACHE_MAX_ENTRIES = int(os.environ.get('REGISTRATION_CACHE_MAX_ENTRIES', '512'))
+CACHE_VERSION_CHECK_INTERVAL = float(os.environ.get('CACHE_VERSION_CHECK_INTERVAL', '1.0'))
+
+# Live feed configuration ('handlers' publishes from the write endpoints,
+# 'changestream' tails db.registrations and needs a replica set)
+REGISTRATION_FEED_SOURCE = os.environ.get('REGISTRATION_FEED_SOURCE', 'handlers')
+REGISTRATION_FEED_QUEUE_SIZE = int(os.environ.get('REGISTRATION_FEED_QUEUE_SIZE', '100'))
+REGISTRATION_FEED_HEARTBEAT = float(os.environ.get('REGISTRATION_FEED_HEARTBEAT', '15'))
+
+# Delta sync configuration
+REGISTRATION_TOMBSTONE_TTL_DAYS = int(os.environ.get('REGISTRATION_TOMBSTONE_TTL_DAYS', '30'))
+# Changes younger than this may still have an in-flight write with a lower sequence number,
+# so they are delivered but the returned token does not move past them
+CHANGE_TOKEN_SETTLE_SECONDS = float(os.environ.get('CHANGE_TOKEN_SETTLE_SECONDS', '2'))
+
+# Bulk import configuration
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '500'))
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', '1000'))
+
+# Submission write batching: collect submissions for a few milliseconds and upsert them together
+REGISTRATION_WRITE_BATCHING = os.environ.get('REGISTRATION_WRITE_BATCHING', 'false').lower() == 'true'
+REGISTRATION_BATCH_WINDOW_MS = float(os.environ.get('REGISTRATION_BATCH_WINDOW_MS', '5'))
+REGISTRATION_BATCH_MAX_SIZE = int(os.environ.get('REGISTRATION_BATCH_MAX_SIZE', '100'))
+
+# Idempotency-Key support: stored responses expire after the TTL; a key left pending
+# by a request that died can be taken over after the pending timeout
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+IDEMPOTENCY_PENDING_TIMEOUT = float(os.environ.get('IDEMPOTENCY_PENDING_TIMEOUT', '60'))
+
+# The mail (aiosmtplib, email.mime), Excel (openpyxl) and bcrypt modules are imported
+# inside the functions that use them, so cold starts do not pay for them
+
+async def send_smtp_message(message):
+    """Send a prepared message through Gmail SMTP (or SMTP_HOST when overridden)"""
+    import aiosmtplib
+    global smtp_sends_in_flight
+    smtp_sends_in_flight += 1
+    started = time.perf_counter()
+    outcome = 'failure'
+    try:
+        with span('smtp_send'):
+            await aiosmtplib.send(
+                message,
+                hostname=SMTP_HOST,
+                port=SMTP_PORT,
+                username=GMAIL_EMAIL,
+                password=GMAIL_PASSWORD,
+                start_tls=SMTP_START_TLS
+            )
+        outcome = 'success'
+    finally:
+        smtp_sends_in_flight -= 1
+        smtp_send_duration.observe(time.perf_counter() - started, outcome)
 
 # Email sending function
-async def send_email_notification(admin_email: str, registration_data: dict, include_excel: bool = True):
+def render_registration_email(registration_data: dict) -> str:
+    """HTML body of the registration notification email"""
+    # Format registration data for email
+    # Calculate age from date of birth (DD/MM/YYYY format)
     try:
-        # Format registration data for email
-        # Calculate age from date of birth (DD/MM/YYYY format)
-        from datetime import datetime
-        try:
-            # Parse DD/MM/YYYY format
-            dob_str = registration_data['personalInfo']['dateOfBirth']
-            dob = datetime.strptime(dob_str, '%d/%m/%Y')
-            today = datetime.today()
-            age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-        except Exception as e:
-            logger.warning(f"Could not parse date of birth: {registration_data['personalInfo']['dateOfBirth']}")
-            age = "N/A"
+        # Parse DD/MM/YYYY format
+        dob_str = registration_data['personalInfo']['dateOfBirth']
+        dob = datetime.strptime(dob_str, '%d/%m/%Y')
+        today = datetime.today()
+        age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+    except Exception as e:
+        logger.warning(f"Could not parse date of birth: {registration_data['personalInfo']['dateOfBirth']}")
+        age = "N/A"
+    
+    email_body = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+    <div style="max-width: 800px; margin: 0 auto; padding: 20px; background: #f9f9f9;">
+        <div style="background: #007AFF; color: white; padding: 20px; border-radius: 8px 8px 0 0;">
+            <h2 style="margin: 0;">New Health Registration Submitted</h2>
+        </div>
         
-        email_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-        <div style="max-width: 800px; margin: 0 auto; padding: 20px; background: #f9f9f9;">
-            <div style="background: #007AFF; color: white; padding: 20px; border-radius: 8px 8px 0 0;">
-                <h2 style="margin: 0;">New Health Registration Submitted</h2>
-            </div>
+        <div style="background: white; padding: 30px; border-radius: 0 0 8px 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+            <h3 style="color: #007AFF; border-bottom: 2px solid #007AFF; padding-bottom: 10px;">Registrant's Personal Information</h3>
+            <table style="width: 100%; border-collapse: collapse; margin-bottom: 30px;">
+                <tr style="background: #f5f5f5;">
+                    <td style="padding: 12px; font-weight: bold; width: 40%;">Full Name:</td>
+                    <td style="padding: 12px;">{registration_data['personalInfo']['registrantName']}</td>
+                </tr>
+                <tr>
+                    <td style="padding: 12px; font-weight: bold;">Apartment Number:</td>
+                    <td style="padding: 12px;">{registration_data['personalInfo']['registrantAptNumber']}</td>
+                </tr>
+                <tr style="background: #f5f5f5;">
+                    <td style="padding: 12px; font-weight: bold;">Date of Birth:</td>
+                    <td style="padding: 12px;">{registration_data['personalInfo']['dateOfBirth']} (Age: {age} years)</td>
+                </tr>
+                <tr>
+                    <td style="padding: 12px; font-weight: bold;">Mobile Phone:</td>
+                    <td style="padding: 12px;">{registration_data['personalInfo']['registrantPhone']}</td>
+                </tr>
+                <tr style="background: #f5f5f5;">
+                    <td style="padding: 12px; font-weight: bold;">Blood Group:</td>
+                    <td style="padding: 12px;"><strong style="color: #FF3B30; font-size: 16px;">{registration_data['personalInfo']['bloodGroup']}</strong></td>
+                </tr>
+            </table>
             
-            <div style="background: white; padding: 30px; border-radius: 0 0 8px 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-                <h3 style="color: #007AFF; border-bottom: 2px solid #007AFF; padding-bottom: 10px;">Registrant's Personal Information</h3>
-                <table style="width: 100%; border-collapse: collapse; margin-bottom: 30px;">
-                    <tr style="background: #f5f5f5;">
-                        <td style="padding: 12px; font-weight: bold; width: 40%;">Full Name:</td>
-                        <td style="padding: 12px;">{registration_data['personalInfo']['registrantName']}</td>
-                    </tr>
+            <h3 style="color: #007AFF; border-bottom: 2px solid #007AFF; padding-bottom: 10px;">Medical Information</h3>
+            <table style="width: 100%; border-collapse: collapse; margin-bottom: 30px;">
+                <tr style="background: #f5f5f5;">
+                    <td style="padding: 12px; font-weight: bold; width: 40%;">Insurance Policy Number:</td>
+                    <td style="padding: 12px;">{registration_data['personalInfo']['insurancePolicy'] or 'Not provided'}</td>
+                </tr>
+                <tr>
+                    <td style="padding: 12px; font-weight: bold;">Insurance Company / ECHS:</td>
+                    <td style="padding: 12px;">{registration_data['personalInfo']['insuranceCompany'] or 'Not provided'}</td>
+                </tr>
+                <tr style="background: #f5f5f5;">
+                    <td style="padding: 12px; font-weight: bold;">Doctor's Name:</td>
+                    <td style="padding: 12px;">{registration_data['personalInfo']['doctorName'] or 'Not provided'}</td>
+                </tr>
+                <tr>
+                    <td style="padding: 12px; font-weight: bold;">Doctor's Contact:</td>
+                    <td style="padding: 12px;">{registration_data['personalInfo']['doctorContact'] or 'Not provided'}</td>
+                </tr>
+                <tr style="background: #f5f5f5;">
+                    <td style="padding: 12px; font-weight: bold;">Hospital Name:</td>
+                    <td style="padding: 12px;">{registration_data['personalInfo']['hospitalName'] or 'Not provided'}</td>
+                </tr>
+                <tr>
+                    <td style="padding: 12px; font-weight: bold;">Hospital Registration Number:</td>
+                    <td style="padding: 12px;">{registration_data['personalInfo']['hospitalNumber'] or 'Not provided'}</td>
+                </tr>
+                <tr style="background: #f5f5f5;">
+                    <td style="padding: 12px; font-weight: bold; vertical-align: top;">Current Ailments:</td>
+                    <td style="padding: 12px;">{registration_data['personalInfo']['currentAilments'] or 'None reported'}</td>
+                </tr>
+            </table>
+            
+            <h3 style="color: #007AFF; border-bottom: 2px solid #007AFF; padding-bottom: 10px; margin-top: 30px;">Buddies Information</h3>
+            """
+    
+    for idx, buddy in enumerate(registration_data['buddies'], 1):
+        bg_color = '#f5f5f5' if idx % 2 == 0 else 'white'
+        email_body += f"""
+            <div style="background: {bg_color}; padding: 15px; margin-bottom: 15px; border-radius: 5px; border-left: 4px solid #34C759;">
+                <h4 style="margin: 0 0 10px 0; color: #34C759;">Buddy {idx}</h4>
+                <table style="width: 100%; border-collapse: collapse;">
                     <tr>
-                        <td style="padding: 12px; font-weight: bold;">Apartment Number:</td>
-                        <td style="padding: 12px;">{registration_data['personalInfo']['registrantAptNumber']}</td>
+                        <td style="padding: 8px; font-weight: bold; width: 35%;">Name:</td>
+                        <td style="padding: 8px;">{buddy['name']}</td>
                     </tr>
-                    <tr style="background: #f5f5f5;">
-                        <td style="padding: 12px; font-weight: bold;">Date of Birth:</td>
-                        <td style="padding: 12px;">{registration_data['personalInfo']['dateOfBirth']} (Age: {age} years)</td>
+                    <tr>
+                        <td style="padding: 8px; font-weight: bold;">Phone:</td>
+                        <td style="padding: 8px;">{buddy['phone']}</td>
                     </tr>
                     <tr>
-                        <td style="padding: 12px; font-weight: bold;">Mobile Phone:</td>
-                        <td style="padding: 12px;">{registration_data['personalInfo']['registrantPhone']}</td>
+                        <td style="padding: 8px; font-weight: bold;">Email:</td>
+                        <td style="padding: 8px;">{buddy['email']}</td>
                     </tr>
-                    <tr style="background: #f5f5f5;">
-                        <td style="padding: 12px; font-weight: bold;">Blood Group:</td>
-                        <td style="padding: 12px;"><strong style="color: #FF3B30; font-size: 16px;">{registration_data['personalInfo']['bloodGroup']}</strong></td>
+                    <tr>
+                        <td style="padding: 8px; font-weight: bold;">Apartment Number:</td>
+                        <td style="padding: 8px;">{buddy['aptNumber']}</td>
                     </tr>
                 </table>
-                
-                <h3 style="color: #007AFF; border-bottom: 2px solid #007AFF; padding-bottom: 10px;">Medical Information</h3>
-                <table style="width: 100%; border-collapse: collapse; margin-bottom: 30px;">
-                    <tr style="background: #f5f5f5;">
-                        <td style="padding: 12px; font-weight: bold; width: 40%;">Insurance Policy Number:</td>
-                        <td style="padding: 12px;">{registration_data['personalInfo']['insurancePolicy'] or 'Not provided'}</td>
-                    </tr>
+            </div>
+        """
+    
+    email_body += """
+            <h3 style="color: #007AFF; border-bottom: 2px solid #007AFF; padding-bottom: 10px; margin-top: 30px;">Next of Kin Contacts</h3>
+            """
+    
+    for idx, kin in enumerate(registration_data['nextOfKin'], 1):
+        bg_color = '#f5f5f5' if idx % 2 == 0 else 'white'
+        email_body += f"""
+            <div style="background: {bg_color}; padding: 15px; margin-bottom: 15px; border-radius: 5px; border-left: 4px solid #FF9500;">
+                <h4 style="margin: 0 0 10px 0; color: #FF9500;">Contact {idx}</h4>
+                <table style="width: 100%; border-collapse: collapse;">
                     <tr>
-                        <td style="padding: 12px; font-weight: bold;">Insurance Company / ECHS:</td>
-                        <td style="padding: 12px;">{registration_data['personalInfo']['insuranceCompany'] or 'Not provided'}</td>
-                    </tr>
-                    <tr style="background: #f5f5f5;">
-                        <td style="padding: 12px; font-weight: bold;">Doctor's Name:</td>
-                        <td style="padding: 12px;">{registration_data['personalInfo']['doctorName'] or 'Not provided'}</td>
+                        <td style="padding: 8px; font-weight: bold; width: 35%;">Name:</td>
+                        <td style="padding: 8px;">{kin['name']}</td>
                     </tr>
                     <tr>
-                        <td style="padding: 12px; font-weight: bold;">Doctor's Contact:</td>
-                        <td style="padding: 12px;">{registration_data['personalInfo']['doctorContact'] or 'Not provided'}</td>
-                    </tr>
-                    <tr style="background: #f5f5f5;">
-                        <td style="padding: 12px; font-weight: bold;">Hospital Name:</td>
-                        <td style="padding: 12px;">{registration_data['personalInfo']['hospitalName'] or 'Not provided'}</td>
+                        <td style="padding: 8px; font-weight: bold;">Phone:</td>
+                        <td style="padding: 8px;">{kin['phone']}</td>
                     </tr>
                     <tr>
-                        <td style="padding: 12px; font-weight: bold;">Hospital Registration Number:</td>
-                        <td style="padding: 12px;">{registration_data['personalInfo']['hospitalNumber'] or 'Not provided'}</td>
-                    </tr>
-                    <tr style="background: #f5f5f5;">
-                        <td style="padding: 12px; font-weight: bold; vertical-align: top;">Current Ailments:</td>
-                        <td style="padding: 12px;">{registration_data['personalInfo']['currentAilments'] or 'None reported'}</td>
+                        <td style="padding: 8px; font-weight: bold;">Email:</td>
+                        <td style="padding: 8px;">{kin['email']}</td>
                     </tr>
                 </table>
-                
-                <h3 style="color: #007AFF; border-bottom: 2px solid #007AFF; padding-bottom: 10px; margin-top: 30px;">Buddies Information</h3>
-                """
-        
-        for idx, buddy in enumerate(registration_data['buddies'], 1):
-            bg_color = '#f5f5f5' if idx % 2 == 0 else 'white'
-            email_body += f"""
-                <div style="background: {bg_color}; padding: 15px; margin-bottom: 15px; border-radius: 5px; border-left: 4px solid #34C759;">
-                    <h4 style="margin: 0 0 10px 0; color: #34C759;">Buddy {idx}</h4>
-                    <table style="width: 100%; border-collapse: collapse;">
-                        <tr>
-                            <td style="padding: 8px; font-weight: bold; width: 35%;">Name:</td>
-                            <td style="padding: 8px;">{buddy['name']}</td>
-                        </tr>
-                        <tr>
-                            <td style="padding: 8px; font-weight: bold;">Phone:</td>
-                            <td style="padding: 8px;">{buddy['phone']}</td>
-                        </tr>
-                        <tr>
-                            <td style="padding: 8px; font-weight: bold;">Email:</td>
-                            <td style="padding: 8px;">{buddy['email']}</td>
-                        </tr>
-                        <tr>
-                            <td style="padding: 8px; font-weight: bold;">Apartment Number:</td>
-                            <td style="padding: 8px;">{buddy['aptNumber']}</td>
-                        </tr>
-                    </table>
-                </div>
-            """
-        
-        email_body += """
-                <h3 style="color: #007AFF; border-bottom: 2px solid #007AFF; padding-bottom: 10px; margin-top: 30px;">Next of Kin Contacts</h3>
-                """
-        
-        for idx, kin in enumerate(registration_data['nextOfKin'], 1):
-            bg_color = '#f5f5f5' if idx % 2 == 0 else 'white'
-            email_body += f"""
-                <div style="background: {bg_color}; padding: 15px; margin-bottom: 15px; border-radius: 5px; border-left: 4px solid #FF9500;">
-                    <h4 style="margin: 0 0 10px 0; color: #FF9500;">Contact {idx}</h4>
-                    <table style="width: 100%; border-collapse: collapse;">
-                        <tr>
-                            <td style="padding: 8px; font-weight: bold; width: 35%;">Name:</td>
-                            <td style="padding: 8px;">{kin['name']}</td>
-                        </tr>
-                        <tr>
-                            <td style="padding: 8px; font-weight: bold;">Phone:</td>
-                            <td style="padding: 8px;">{kin['phone']}</td>
-                        </tr>
-                        <tr>
-                            <td style="padding: 8px; font-weight: bold;">Email:</td>
-                            <td style="padding: 8px;">{kin['email']}</td>
-                        </tr>
-                    </table>
-                </div>
-            """
-        
-        email_body += """
-            </div>
-            
-            <div style="background: #f0f0f0; padding: 20px; text-align: center; margin-top: 20px; border-radius: 8px;">
-                <p style="margin: 0; color: #666; font-size: 14px;">
-                    This registration was submitted via the Health Registration App<br>
-                    Registration Date: """ + datetime.now().strftime('%B %d, %Y at %I:%M %p') + """
-                </p>
             </div>
-        </div>
-        </body>
-        </html>
         """
+    
+    email_body += """
+        </div>
+        
+        <div style="background: #f0f0f0; padding: 20px; text-align: center; margin-top: 20px; border-radius: 8px;">
+            <p style="margin: 0; color: #666; font-size: 14px;">
+                This registration was submitted via the Health Registration App<br>
+                Registration Date: """ + datetime.now().strftime('%B %d, %Y at %I:%M %p') + """
+            </p>
+        </div>
+    </div>
+    </body>
+    </html>
+    """
+    
+    return email_body
+
+async def send_email_notification(admin_email: str, registration_data: dict, include_excel: bool = True):
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.base import MIMEBase
+    from email import encoders
+    try:
+        email_body = render_registration_email(registration_data)
         
         # Create email message
         message = MIMEMultipart('mixed')
@@ -227,14 +827,7 @@ async def send_email_notification(admin_email: str, registration_data: dict, inc
                 logger.error(f"Failed to create Excel attachment: {str(e)}")
         
         # Send email via Gmail SMTP
-        await aiosmtplib.send(
-            message,
-            hostname='smtp.gmail.com',
-            port=587,
-            username=GMAIL_EMAIL,
-            password=GMAIL_PASSWORD,
-            start_tls=True
-        )
+        await send_smtp_message(message)
         
         logger.info(f"Email sent successfully to {admin_email}")
         return True
@@ -244,6 +837,8 @@ async def send_email_notification(admin_email: str, registration_data: dict, inc
 
 # Admin confirmation email function
 async def send_admin_confirmation_email(admin_data: dict, plain_password: str):
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
     try:
         email_body = f"""
         <html>
@@ -339,14 +934,7 @@ async def send_admin_confirmation_email(admin_data: dict, plain_password: str):
         message.attach(html_part)
         
         # Send email via Gmail SMTP
-        await aiosmtplib.send(
-            message,
-            hostname='smtp.gmail.com',
-            port=587,
-            username=GMAIL_EMAIL,
-            password=GMAIL_PASSWORD,
-            start_tls=True
-        )
+        await send_smtp_message(message)
         
         logger.info(f"Admin confirmation email sent successfully to {admin_data['email']}")
         return True
@@ -354,6 +942,209 @@ async def send_admin_confirmation_email(admin_data: dict, plain_password: str):
         logger.error(f"Failed to send admin confirmation email: {str(e)}")
         return False
 
+# Import digest email function
+async def send_import_digest_email(recipient_email: str, summary: dict):
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+    try:
+        email_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px; background: #f9f9f9;">
+            <div style="background: #007AFF; color: white; padding: 20px; border-radius: 8px 8px 0 0;">
+                <h2 style="margin: 0;">Registrations Imported</h2>
+            </div>
+            
+            <div style="background: white; padding: 30px; border-radius: 0 0 8px 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+                <p style="font-size: 16px; color: #666; margin: 0 0 20px 0;">
+                    A bulk import was completed from <strong>{summary['filename']}</strong>.
+                </p>
+                <table style="width: 100%; border-collapse: collapse;">
+                    <tr style="background: #f5f5f5;">
+                        <td style="padding: 12px; font-weight: bold; width: 40%;">Rows Processed:</td>
+                        <td style="padding: 12px;">{summary['total_rows']}</td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 12px; font-weight: bold;">New Registrations:</td>
+                        <td style="padding: 12px;">{summary['created']}</td>
+                    </tr>
+                    <tr style="background: #f5f5f5;">
+                        <td style="padding: 12px; font-weight: bold;">Updated Registrations:</td>
+                        <td style="padding: 12px;">{summary['updated']}</td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 12px; font-weight: bold;">Rows With Errors:</td>
+                        <td style="padding: 12px;">{summary['failed']}</td>
+                    </tr>
+                </table>
+            </div>
+        </div>
+        </body>
+        </html>
+        """
+        
+        message = MIMEMultipart('alternative')
+        message['From'] = GMAIL_EMAIL
+        message['To'] = recipient_email
+        message['Subject'] = f"Registrations Imported - {summary['created']} new, {summary['updated']} updated"
+        
+        html_part = MIMEText(email_body, 'html')
+        message.attach(html_part)
+        
+        # Send email via Gmail SMTP
+        await send_smtp_message(message)
+        
+        logger.info(f"Import digest email sent successfully to {recipient_email}")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to send import digest email: {str(e)}")
+        return False
+
+# In-process rate limiting
+class TokenBucketLimiter:
+    """Token bucket per client key: bursts up to the limit, refilled evenly over the period"""
+
+    def __init__(self, name: str, limit: str):
+        requests, seconds = limit.split('/')
+        self.name = name
+        self.capacity = int(requests)
+        self.refill_rate = self.capacity / float(seconds)
+        self._buckets = {}
+
+    def acquire(self, key: str) -> float:
+        """Take a token for key; return 0 if allowed, else seconds until one is available"""
+        if self.capacity <= 0:
+            return 0.0
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > RATE_LIMIT_MAX_CLIENTS:
+                self._prune(now)
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        return (1 - tokens) / self.refill_rate
+
+    async def acquire_shared(self, key: str) -> float:
+        """acquire() against a bucket document updated atomically in db.rate_limits"""
+        if self.capacity <= 0:
+            return 0.0
+        now = datetime.utcnow()
+        elapsed = {"$max": [0, {"$divide": [{"$subtract": [now, {"$ifNull": ["$updatedAt", now]}]}, 1000]}]}
+        try:
+            doc = await db.rate_limits.find_one_and_update(
+                {"_id": f"{self.name}:{key}"},
+                [
+                    {"$set": {
+                        "tokens": {"$min": [
+                            self.capacity,
+                            {"$add": [{"$ifNull": ["$tokens", self.capacity]}, {"$multiply": [elapsed, self.refill_rate]}]}
+                        ]},
+                        "updatedAt": now
+                    }},
+                    {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                    {"$set": {
+                        "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                        # A bucket idle long enough to refill is equivalent to no bucket, so let it expire
+                        "expiresAt": now + timedelta(seconds=self.capacity / self.refill_rate)
+                    }}
+                ],
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            # Fail open rather than lock every client out while MongoDB is unavailable
+            logger.error(f"Error checking rate limit '{self.name}': {str(e)}")
+            return 0.0
+        return 0.0 if doc['allowed'] else (1 - doc['tokens']) / self.refill_rate
+
+    def _prune(self, now: float):
+        # Buckets idle long enough to have refilled are equivalent to no bucket
+        full_after = self.capacity / self.refill_rate
+        for key, (_, updated_at) in list(self._buckets.items()):
+            if now - updated_at >= full_after:
+                del self._buckets[key]
+
+password_rate_limiter = TokenBucketLimiter('password', RATE_LIMIT_PASSWORD)
+admin_rate_limiter = TokenBucketLimiter('admin', RATE_LIMIT_ADMIN)
+submission_rate_limiter = TokenBucketLimiter('submission', RATE_LIMIT_SUBMISSION)
+
+def is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in RATE_LIMIT_TRUSTED_PROXIES)
+
+def client_key(request: Request) -> str:
+    """The peer address, or behind trusted proxies the nearest untrusted address in
+    X-Forwarded-For: each proxy appends the address it received the request from"""
+    client = request.client.host if request.client else 'unknown'
+    if not is_trusted_proxy(client):
+        return client
+    forwarded = [address.strip() for address in request.headers.get('x-forwarded-for', '').split(',') if address.strip()]
+    for address in reversed(forwarded):
+        client = address
+        if not is_trusted_proxy(address):
+            break
+    return client
+
+def rate_limited(limiter: TokenBucketLimiter):
+    """Route dependency that answers 429 with Retry-After once the client's bucket is empty"""
+    async def check_rate_limit(request: Request):
+        if RATE_LIMIT_STORE == 'mongo':
+            retry_after = await limiter.acquire_shared(client_key(request))
+        else:
+            retry_after = limiter.acquire(client_key(request))
+        if retry_after:
+            logger.warning(f"Rate limit '{limiter.name}' exceeded by {client_key(request)}")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+    return Depends(check_rate_limit)
+
+# Password hashing on a dedicated thread pool
+bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_MAX_WORKERS, thread_name_prefix='bcrypt')
+bcrypt_pool_stats = {"in_flight": 0, "max_in_flight": 0, "completed": 0, "total_wait_seconds": 0.0}
+
+async def run_bcrypt(func, *args):
+    loop = asyncio.get_running_loop()
+    submitted_at = time.monotonic()
+    bcrypt_pool_stats['in_flight'] += 1
+    bcrypt_pool_stats['max_in_flight'] = max(bcrypt_pool_stats['max_in_flight'], bcrypt_pool_stats['in_flight'])
+    
+    started_at = []
+    
+    def timed_call():
+        # Only note when a worker picked this call up; the shared stats are updated on the event loop
+        started_at.append(time.monotonic())
+        return func(*args)
+    
+    try:
+        return await loop.run_in_executor(bcrypt_executor, timed_call)
+    finally:
+        # Time spent queued behind other hashes before a worker picked this one up
+        if started_at:
+            bcrypt_pool_stats['total_wait_seconds'] += started_at[0] - submitted_at
+        bcrypt_pool_stats['in_flight'] -= 1
+        bcrypt_pool_stats['completed'] += 1
+
+def bcrypt_queue_depth() -> int:
+    """Calls waiting for a free bcrypt worker"""
+    return max(0, bcrypt_pool_stats['in_flight'] - BCRYPT_MAX_WORKERS)
+
+async def check_password(password: str, password_hash: str) -> bool:
+    import bcrypt
+    return await run_bcrypt(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+async def hash_password(password: str) -> str:
+    import bcrypt
+    hashed = await run_bcrypt(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt())
+    return hashed.decode('utf-8')
+
 # Define Models
 class Admin(BaseModel):
     name: str
@@ -381,14 +1172,45 @@ class AdminDeleteRequest(BaseModel):
     email: str
     password: str
 
-class AdminRegistrationUpdateRequest(BaseModel):
-    password: str
+class AdminAuthRequest(BaseModel):
+    """Body of an admin endpoint; password is optional when a session token is sent instead"""
+    password: Optional[str] = None
+
+class AdminRegistrationDeleteRequest(AdminAuthRequest):
+    pass
+
+class RegistrationBatchFilter(BaseModel):
+    registrantAptNumber: Optional[str] = None
+    bloodGroup: Optional[str] = None
+    updatedBefore: Optional[datetime] = None
+
+class RegistrationBatchUpdateItem(BaseModel):
+    id: str
     personalInfo: dict
     buddies: List[dict]
     nextOfKin: List[dict]
 
-class AdminRegistrationDeleteRequest(BaseModel):
-    password: str
+class AdminRegistrationBatchUpdateRequest(AdminAuthRequest):
+    # Either full replacements per id...
+    items: Optional[List[RegistrationBatchUpdateItem]] = None
+    # ...or personalInfo fields to set on every registration matching a filter
+    filter: Optional[RegistrationBatchFilter] = None
+    personalInfo: Optional[dict] = None
+
+class AdminRegistrationBatchDeleteRequest(AdminAuthRequest):
+    ids: Optional[List[str]] = None
+    filter: Optional[RegistrationBatchFilter] = None
+
+class ContactReplaceRequest(AdminAuthRequest):
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    newName: Optional[str] = None
+    newPhone: Optional[str] = None
+    newEmail: Optional[EmailStr] = None
+
+class ExportCheckpointRequest(AdminAuthRequest):
+    # Export the checkpoint's previous window again instead of advancing it
+    rerun: bool = False
 
 class PersonalInfo(BaseModel):
     registrantName: str
@@ -418,23 +1240,722 @@ class NextOfKin(BaseModel):
     city: Optional[str] = "Bangalore"
     address: Optional[str] = ""
 
-class Registration(BaseModel):
-    personalInfo: PersonalInfo
-    buddies: List[Buddy]
-    nextOfKin: List[NextOfKin]
-    createdAt: datetime = Field(default_factory=datetime.utcnow)
+class Registration(BaseModel):
+    personalInfo: PersonalInfo
+    buddies: List[Buddy]
+    nextOfKin: List[NextOfKin]
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+
+class RegistrationCreate(BaseModel):
+    personalInfo: PersonalInfo
+    buddies: List[Buddy]
+    nextOfKin: List[NextOfKin]
+
+class RegistrationUpdate(BaseModel):
+    """The parts of a registration an admin replaces; the count limits are
+    enforced by pydantic-core in the same pass that parses the payload"""
+    personalInfo: PersonalInfo
+    buddies: List[Buddy] = Field(min_length=1, max_length=2)
+    nextOfKin: List[NextOfKin] = Field(min_length=1, max_length=3)
+
+class AdminRegistrationUpdateRequest(RegistrationUpdate, AdminAuthRequest):
+    pass
+
+class RegistrationResponse(BaseModel):
+    id: str
+    personalInfo: PersonalInfo
+    buddies: List[Buddy]
+    nextOfKin: List[NextOfKin]
+    createdAt: datetime
+
+registration_list_adapter = TypeAdapter(List[RegistrationResponse])
+
+def registration_to_response(reg: dict) -> RegistrationResponse:
+    """Build the API response model from a registration document"""
+    return RegistrationResponse(
+        id=str(reg['_id']),
+        personalInfo=PersonalInfo(**reg['personalInfo']),
+        buddies=[Buddy(**buddy) for buddy in reg['buddies']],
+        nextOfKin=[NextOfKin(**kin) for kin in reg['nextOfKin']],
+        createdAt=reg['createdAt']
+    )
+
+# In-process read cache
+class VersionedCache:
+    """Bounded LRU cache of serialized responses, kept coherent across
+    worker processes through a version document in db.cache_versions"""
+
+    def __init__(self, name: str, max_entries: int, check_interval: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._checked_at = 0.0
+
+    def clear(self):
+        self._entries.clear()
+        self.generation += 1
+
+    async def sync(self):
+        """Drop every entry if another worker bumped the shared version"""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        doc = await db.cache_versions.find_one({"_id": self.name})
+        version = doc['version'] if doc else 0
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+    def get(self, key: str):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, generation: int):
+        # Skip values read before an invalidation that happened while we awaited Mongo
+        if generation != self.generation:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def invalidate(self, *keys: str):
+        """Drop keys locally and bump the shared version so other workers drop theirs"""
+        for key in keys:
+            self._entries.pop(key, None)
+        self.generation += 1
+        doc = await db.cache_versions.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        # Another worker wrote since our last sync, so anything we hold may be stale
+        if self._version is None or doc['version'] != self._version + 1:
+            self.clear()
+        self._version = doc['version']
+        self._checked_at = time.monotonic()
+
+class TenantCaches:
+    """One VersionedCache per tenant, created on first use; the caches of the least
+    recently active tenants are dropped once more than max_tenants are held"""
+
+    def __init__(self, name: str, max_entries: int, check_interval: float, max_tenants: int):
+        self.name = name
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self.max_tenants = max_tenants
+        self._caches = OrderedDict()
+
+    def current(self) -> VersionedCache:
+        """The cache of the request's tenant"""
+        tenant = current_tenant.get()
+        cache = self._caches.get(tenant)
+        if cache is not None:
+            self._caches.move_to_end(tenant)
+            return cache
+        # Versioned per tenant, so a write in one society leaves the others' caches warm
+        cache = self._caches[tenant] = VersionedCache(tenant_doc_id(self.name), self.max_entries, self.check_interval)
+        while len(self._caches) > self.max_tenants:
+            self._caches.popitem(last=False)
+        return cache
+
+registration_caches = TenantCaches(
+    'registrations', REGISTRATION_CACHE_MAX_ENTRIES, CACHE_VERSION_CHECK_INTERVAL, TENANT_CACHE_MAX_TENANTS
+)
+
+REGISTRATION_LIST_CACHE_KEY = 'registrations'
+
+# The admin document (profile, password hash and recipients) changes rarely but is read by nearly every handler
+admin_caches = TenantCaches('admins', 1, CACHE_VERSION_CHECK_INTERVAL, TENANT_CACHE_MAX_TENANTS)
+
+ADMIN_CACHE_KEY = 'admin'
+
+async def get_cached_admin() -> Optional[dict]:
+    """The tenant's admin document, or None, served from the in-process cache"""
+    admin_cache = admin_caches.current()
+    await admin_cache.sync()
+    cached = admin_cache.get(ADMIN_CACHE_KEY)
+    if cached is None:
+        generation = admin_cache.generation
+        # Wrapped in a tuple so that 'no admin' is cached too
+        cached = (await db.admins.find_one(tenant_scoped()),)
+        admin_cache.set(ADMIN_CACHE_KEY, cached, generation)
+    return dict(cached[0]) if cached[0] else None
+
+async def invalidate_admin_cache():
+    """Call after every write to db.admins"""
+    admin_cache = admin_caches.current()
+    try:
+        await admin_cache.invalidate(ADMIN_CACHE_KEY)
+    except Exception as e:
+        admin_cache.clear()
+        logger.error(f"Failed to bump admin cache version: {str(e)}")
+
+def registration_cache_key(registration_id: str) -> str:
+    return f"registration:{registration_id}"
+
+async def invalidate_registration_cache(*registration_ids: str):
+    registration_cache = registration_caches.current()
+    try:
+        await registration_cache.invalidate(
+            REGISTRATION_LIST_CACHE_KEY,
+            *[registration_cache_key(registration_id) for registration_id in registration_ids]
+        )
+    except Exception as e:
+        # Fall back to a local flush; other workers catch up on their next version check
+        registration_cache.clear()
+        logger.error(f"Failed to bump registration cache version: {str(e)}")
+
+# Live registration feed: tenant -> queues of its connected admin clients
+registration_feed_subscribers = {}
+
+def format_feed_event(event_type: str, payload: dict) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(payload)}\n\n"
+
+def publish_registration_event(event_type: str, registration_id: str, registration: Optional[dict] = None,
+                               tenant: Optional[str] = None):
+    """Fan a created/updated/deleted event out to every feed client of the tenant (the request's by default)"""
+    subscribers = registration_feed_subscribers.get(tenant or current_tenant.get())
+    if not subscribers:
+        return
+    payload = {"type": event_type, "id": registration_id}
+    if registration is not None:
+        payload['registration'] = registration_to_response(registration).model_dump(mode='json')
+    message = format_feed_event(event_type, payload)
+    
+    for queue in list(subscribers):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client fell behind; drop its backlog and ask it to refetch the list once
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(format_feed_event('resync', {"type": "resync"}))
+
+async def registration_changed(event_type: str, registration_id: str, registration: Optional[dict] = None,
+                               previous: Optional[dict] = None):
+    """Hook called by the write handlers after a registration is created, updated or deleted"""
+    await registrations_changed([(event_type, registration_id, registration, previous)])
+
+async def registrations_changed(changes: List[tuple]):
+    """Bulk form of registration_changed for (event_type, registration_id, registration, previous) tuples,
+    costing one cache version bump and one stats update however many registrations changed"""
+    if not changes:
+        return
+    await invalidate_registration_cache(*[registration_id for _, registration_id, _, _ in changes])
+    await apply_registration_stats([(registration, previous) for _, _, registration, previous in changes])
+    if REGISTRATION_FEED_SOURCE == 'handlers':
+        for event_type, registration_id, registration, _ in changes:
+            publish_registration_event(event_type, registration_id, registration)
+
+async def watch_registration_changes():
+    """Publish feed events from a MongoDB change stream"""
+    operations = {"insert": "created", "update": "updated", "replace": "updated", "delete": "deleted"}
+    pipeline = [{"$match": {"operationType": {"$in": list(operations)}}}]
+    while True:
+        try:
+            async with db.registrations.watch(pipeline, full_document='updateLookup') as stream:
+                async for change in stream:
+                    registration = change.get('fullDocument')
+                    if registration is not None:
+                        tenant = registration.get('tenantId')
+                    else:
+                        # Deletes carry only the _id; the tombstone written before the delete names the tenant
+                        tombstone = await db.registration_tombstones.find_one(
+                            {"_id": change['documentKey']['_id']}, {"tenantId": 1}
+                        )
+                        tenant = tombstone.get('tenantId') if tombstone else None
+                    if tenant is None:
+                        continue
+                    publish_registration_event(
+                        operations[change['operationType']],
+                        str(change['documentKey']['_id']),
+                        registration,
+                        tenant
+                    )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Registration change stream failed, retrying: {str(e)}")
+            await asyncio.sleep(5)
+
+# Dashboard statistics, kept in a single counters document
+AGE_BRACKETS = [(17, '0-17'), (39, '18-39'), (59, '40-59'), (74, '60-74')]
+
+def stats_key(value: Optional[str]) -> str:
+    # Mongo field names cannot contain dots or start with $
+    return (value or '').strip().upper().replace('.', '_').lstrip('$') or 'UNKNOWN'
+
+def apartment_block(apt_number: Optional[str]) -> Optional[str]:
+    """Block/tower prefix of an apartment number, e.g. 'A-101' or 'A101' -> 'A'"""
+    match = re.match(r'\s*([^-/\s]+)[-/\s]', apt_number or '') or re.match(r'\s*([A-Za-z]+)', apt_number or '')
+    return match.group(1) if match else None
+
+def birth_year(date_of_birth: Optional[str]) -> Optional[str]:
+    match = re.search(r'(\d{4})\s*$', date_of_birth or '')
+    return match.group(1) if match else None
+
+def stats_counters(blood_group: Optional[str], apt_block: Optional[str], year: Optional[str], without_insurance: bool) -> dict:
+    """Counter paths one registration contributes to in the stats document"""
+    counters = {
+        'total': 1,
+        f"bloodGroup.{stats_key(blood_group)}": 1,
+        f"aptBlock.{stats_key(apt_block)}": 1,
+        # Birth year rather than age, so counters do not drift as people have birthdays
+        f"birthYear.{stats_key(year)}": 1,
+    }
+    if without_insurance:
+        counters['withoutInsurance'] = 1
+    return counters
+
+def registration_stats_counters(personal: dict) -> dict:
+    return stats_counters(
+        personal.get('bloodGroup'),
+        apartment_block(personal.get('registrantAptNumber')),
+        birth_year(personal.get('dateOfBirth')),
+        not (personal.get('insurancePolicy') or '').strip() and not (personal.get('insuranceCompany') or '').strip()
+    )
+
+def age_bracket(year: str, current_year: int) -> str:
+    if not year.isdigit():
+        return 'UNKNOWN'
+    age = current_year - int(year)
+    for upper, label in AGE_BRACKETS:
+        if age <= upper:
+            return label
+    return '75+'
+
+async def apply_registration_stats(versions: List[tuple]):
+    """Move counters from each registration's previous version to its new one with a single $inc"""
+    delta = {}
+    for registration, previous in versions:
+        if registration:
+            for path, count in registration_stats_counters(registration['personalInfo']).items():
+                delta[path] = delta.get(path, 0) + count
+        if previous:
+            for path, count in registration_stats_counters(previous['personalInfo']).items():
+                delta[path] = delta.get(path, 0) - count
+    delta = {path: count for path, count in delta.items() if count}
+    if not delta:
+        return
+    
+    try:
+        await db.registration_stats.update_one(
+            {"_id": tenant_doc_id('registrations')},
+            {"$inc": delta, "$set": {"tenantId": current_tenant.get(), "updatedAt": datetime.utcnow()}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Failed to update registration stats: {str(e)}")
+
+async def rebuild_registration_stats() -> dict:
+    """Recompute the tenant's stats document from scratch with an aggregation over db.registrations"""
+    def regex_capture(field: str, regex: str):
+        return {"$let": {
+            "vars": {"match": {"$regexFind": {"input": {"$ifNull": [field, ""]}, "regex": regex}}},
+            "in": {"$arrayElemAt": ["$$match.captures", 0]}
+        }}
+    
+    def is_blank(field: str):
+        return {"$eq": [{"$trim": {"input": {"$ifNull": [field, ""]}}}, ""]}
+    
+    # Mirrors apartment_block(), birth_year() and the insurance rule in registration_stats_counters()
+    pipeline = [
+        {"$match": tenant_scoped()},
+        {"$group": {
+            "_id": {
+                "bloodGroup": "$personalInfo.bloodGroup",
+                "aptBlock": {"$ifNull": [
+                    regex_capture("$personalInfo.registrantAptNumber", r"^\s*([^-/\s]+)[-/\s]"),
+                    regex_capture("$personalInfo.registrantAptNumber", r"^\s*([A-Za-z]+)")
+                ]},
+                "birthYear": regex_capture("$personalInfo.dateOfBirth", r"(\d{4})\s*$"),
+                "withoutInsurance": {"$and": [
+                    is_blank("$personalInfo.insurancePolicy"),
+                    is_blank("$personalInfo.insuranceCompany")
+                ]}
+            },
+            "count": {"$sum": 1}
+        }}
+    ]
+    
+    stats = {}
+    async for group in db.registrations.aggregate(pipeline):
+        key = group['_id']
+        counters = stats_counters(key.get('bloodGroup'), key.get('aptBlock'), key.get('birthYear'), key['withoutInsurance'])
+        for path, count in counters.items():
+            section, _, name = path.partition('.')
+            if name:
+                stats.setdefault(section, {})
+                stats[section][name] = stats[section].get(name, 0) + count * group['count']
+            else:
+                stats[section] = stats.get(section, 0) + count * group['count']
+    
+    stats['tenantId'] = current_tenant.get()
+    stats['updatedAt'] = datetime.utcnow()
+    await db.registration_stats.replace_one({"_id": tenant_doc_id('registrations')}, stats, upsert=True)
+    logger.info(f"Rebuilt registration stats for {stats.get('total', 0)} registrations of tenant {stats['tenantId']}")
+    return stats
+
+async def rebuild_all_registration_stats():
+    """rebuild_registration_stats for every tenant that has registrations"""
+    for tenant in await db.registrations.distinct('tenantId'):
+        token = current_tenant.set(tenant)
+        try:
+            await rebuild_registration_stats()
+        finally:
+            current_tenant.reset(token)
+
+# Emergency blood donor lookup: recipient group -> groups that can donate to it
+BLOOD_DONOR_GROUPS = {
+    'O-': ['O-'],
+    'O+': ['O-', 'O+'],
+    'A-': ['O-', 'A-'],
+    'A+': ['O-', 'O+', 'A-', 'A+'],
+    'B-': ['O-', 'B-'],
+    'B+': ['O-', 'O+', 'B-', 'B+'],
+    'AB-': ['O-', 'A-', 'B-', 'AB-'],
+    'AB+': ['O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+'],
+}
+
+def normalize_blood_group(value: Optional[str]) -> str:
+    group = (value or '').upper().replace('POSITIVE', '+').replace('NEGATIVE', '-').replace('POS', '+').replace('NEG', '-')
+    # An unencoded '+' in a query string arrives as a space
+    if group.endswith(' ') and not group.rstrip().endswith(('+', '-')):
+        group = group.rstrip() + '+'
+    return group.replace(' ', '')
+
+def apartment_unit(apt_number: Optional[str]) -> Optional[int]:
+    """Trailing unit number of an apartment, e.g. 'A-1203' -> 1203"""
+    match = re.search(r'(\d+)\s*$', apt_number or '')
+    return int(match.group(1)) if match else None
+
+def apartment_fields(personal_info: dict) -> dict:
+    """aptBlock and aptUnit, stored on each registration for the indexed donor search"""
+    apt_number = personal_info.get('registrantAptNumber')
+    return {"aptBlock": stats_key(apartment_block(apt_number)), "aptUnit": apartment_unit(apt_number)}
+
+def unit_distance(unit: Optional[int], origin_unit: Optional[int]) -> tuple:
+    if unit is None or origin_unit is None:
+        return (float('inf'), float('inf'))
+    # Apartment numbers are floor * 100 + unit, e.g. 1203 is the 12th floor
+    return (abs(unit // 100 - origin_unit // 100), abs(unit - origin_unit))
+
+def apartment_distance(apt_number: Optional[str], origin: Optional[str]) -> tuple:
+    """Sort key for how far an apartment is from the origin: other block, then floors, then units"""
+    if not origin:
+        return (0, 0, 0)
+    other_block = int(stats_key(apartment_block(apt_number)) != stats_key(apartment_block(origin)))
+    return (other_block,) + unit_distance(apartment_unit(apt_number), apartment_unit(origin))
+
+async def nearest_donors(query: dict, origin_unit: Optional[int], recipient_group: str, limit: int) -> List[dict]:
+    """Up to limit registrations matching query, nearest to origin_unit first and exact group matches
+    first among equally near ones. Walking aptUnit up from the origin and down from it yields two
+    streams already in distance order, so each is an index range scan stopped at limit; registrations
+    without a unit number (all of them when there is no origin unit) come last."""
+    projection = {
+        "personalInfo.registrantName": 1,
+        "personalInfo.registrantAptNumber": 1,
+        "personalInfo.registrantPhone": 1,
+        "personalInfo.bloodGroup": 1,
+        "aptUnit": 1
+    }
+    def donor_key(reg):
+        return (unit_distance(reg['aptUnit'], origin_unit), reg['personalInfo'].get('bloodGroup') != recipient_group)
+    
+    nearest = []
+    if origin_unit is not None:
+        up = await db.registrations.find(
+            {**query, "aptUnit": {"$gte": origin_unit}}, projection
+        ).sort("aptUnit", 1).limit(limit).to_list(limit)
+        down = await db.registrations.find(
+            {**query, "aptUnit": {"$lt": origin_unit}}, projection
+        ).sort("aptUnit", -1).limit(limit).to_list(limit)
+        nearest = sorted(up + down, key=donor_key)[:limit]
+        if len(nearest) == limit:
+            # The streams may have cut off exact group matches sharing the farthest kept distance
+            boundary = unit_distance(nearest[-1]['aptUnit'], origin_unit)
+            units = [unit for unit in (origin_unit - boundary[1], origin_unit + boundary[1])
+                     if unit_distance(unit, origin_unit) == boundary]
+            tied = await db.registrations.find({**query, "aptUnit": {"$in": units}}, projection).to_list(None)
+            kept = {reg['_id'] for reg in nearest}
+            nearest = sorted(nearest + [reg for reg in tied if reg['_id'] not in kept], key=donor_key)[:limit]
+    
+    other_groups = [group for group in query['personalInfo.bloodGroup']['$in'] if group != recipient_group]
+    for group_filter in (recipient_group, {"$in": other_groups}):
+        if len(nearest) >= limit:
+            break
+        remaining = limit - len(nearest)
+        unitless = {**query, "personalInfo.bloodGroup": group_filter}
+        if origin_unit is not None:
+            unitless['aptUnit'] = None
+        nearest += await db.registrations.find(unitless, projection).limit(remaining).to_list(remaining)
+    return nearest
+
+async def backfill_apartment_fields() -> int:
+    """Populate aptBlock and aptUnit on registrations written before the fields existed"""
+    updates = []
+    async for reg in db.registrations.find({"aptBlock": {"$exists": False}}, {"personalInfo.registrantAptNumber": 1}):
+        updates.append(UpdateOne({"_id": reg['_id']}, {"$set": apartment_fields(reg['personalInfo'])}))
+    if updates:
+        await db.registrations.bulk_write(updates, ordered=False)
+    logger.info(f"Backfilled aptBlock/aptUnit on {len(updates)} registrations")
+    return len(updates)
+
+# Reverse contact index over buddies[] and nextOfKin[]
+def normalize_phone(phone: Optional[str]) -> str:
+    digits = re.sub(r'\D', '', phone or '')
+    # Compare on the last 10 digits so '+91 98450 12345' and '9845012345' match
+    return digits[-10:]
+
+def normalize_email(email: Optional[str]) -> str:
+    return (email or '').strip().lower()
+
+def contact_lookup_key(phone: Optional[str] = None, email: Optional[str] = None) -> str:
+    if bool(phone) == bool(email):
+        raise HTTPException(status_code=400, detail="Provide exactly one of phone or email")
+    key = f"phone:{normalize_phone(phone)}" if phone else f"email:{normalize_email(email)}"
+    if key.endswith(':'):
+        raise HTTPException(status_code=400, detail="Invalid phone or email")
+    return key
+
+def contact_keys(buddies: List[dict], next_of_kin: List[dict]) -> List[str]:
+    """Normalized phone/email keys of every buddy and next of kin, stored for the multikey index"""
+    keys = set()
+    for contact in list(buddies) + list(next_of_kin):
+        if normalize_phone(contact.get('phone')):
+            keys.add(f"phone:{normalize_phone(contact.get('phone'))}")
+        if normalize_email(contact.get('email')):
+            keys.add(f"email:{normalize_email(contact.get('email'))}")
+    return sorted(keys)
+
+async def backfill_contact_keys() -> int:
+    """Populate contactKeys on registrations written before the field existed"""
+    updates = []
+    async for reg in db.registrations.find({"contactKeys": {"$exists": False}}, {"buddies": 1, "nextOfKin": 1}):
+        updates.append(UpdateOne(
+            {"_id": reg['_id']},
+            {"$set": {"contactKeys": contact_keys(reg['buddies'], reg['nextOfKin'])}}
+        ))
+    if updates:
+        await db.registrations.bulk_write(updates, ordered=False)
+    logger.info(f"Backfilled contact keys on {len(updates)} registrations")
+    return len(updates)
+
+def contact_matches(contact: dict, key: str) -> bool:
+    kind, _, value = key.partition(':')
+    if kind == 'phone':
+        return normalize_phone(contact.get('phone')) == value
+    return normalize_email(contact.get('email')) == value
+
+# Delta sync change tokens
+async def next_change_seq(count: int = 1) -> int:
+    """Reserve count consecutive registration change sequence numbers and return the first.
+    Bulk writes give each row its own number so a page of changes never has to split a group."""
+    counter = await db.counters.find_one_and_update(
+        {"_id": "registration_changes"},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter['seq'] - count + 1
+
+def format_change_token(seq: int) -> str:
+    return f"{seq}.{int(time.time())}"
+
+def parse_change_token(token: str):
+    """Split a change token into (sequence number, unix time it was issued)"""
+    try:
+        seq, issued_at = token.split('.')
+        return int(seq), int(issued_at)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid change token")
+
+def merge_registration_changes(upserts: List[dict], tombstones: List[dict]) -> List[tuple]:
+    """(changeSeq, changed at, document, is deletion) for registrations and tombstones, in sequence order"""
+    return sorted(
+        [(reg['changeSeq'], reg['updatedAt'], reg, False) for reg in upserts] +
+        [(tomb['changeSeq'], tomb['deletedAt'], tomb, True) for tomb in tombstones],
+        key=lambda change: change[0]
+    )
+
+def page_registration_changes(changes: List[tuple], since_seq: int, limit: int, settle_cutoff: float) -> tuple:
+    """Cut the first page from merged changes fetched with limit + 1, returning (page, token_seq, has_more).
+    A page never ends partway through a sequence number, since the token cannot point between changes
+    that share one, and has_more is only set when the token reached the end of the page"""
+    has_more = len(changes) > limit
+    page = changes[:limit]
+    if has_more:
+        boundary_seq = changes[limit][0]
+        page = [change for change in page if change[0] != boundary_seq]
+    
+    token_seq = since_seq
+    for seq, changed_at, _, _ in page:
+        if changed_at.timestamp() <= settle_cutoff:
+            token_seq = max(token_seq, seq)
+    
+    if not page or token_seq < page[-1][0]:
+        # Part of the page is still settling; following has_more now would return the same page again
+        has_more = False
+    return page, token_seq, has_more
+
+# Named incremental export checkpoints: each consumer keeps a watermark on updatedAt
+EXPORT_CHECKPOINT_NAME = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+# Used by download-new-excel and advanced by download-all-excel
+DEFAULT_EXPORT_CHECKPOINT = 'default'
+
+async def backfill_tenant_ids() -> int:
+    """Assign documents written before multi-community tenancy to DEFAULT_TENANT"""
+    modified = 0
+    for collection in (db.registrations, db.admins, db.registration_tombstones, db.export_checkpoints):
+        result = await collection.update_many(
+            {"tenantId": {"$exists": False}},
+            {"$set": {"tenantId": DEFAULT_TENANT}}
+        )
+        modified += result.modified_count
+    logger.info(f"Backfilled tenantId on {modified} documents")
+    return modified
+
+async def backfill_updated_at() -> int:
+    """Set updatedAt from createdAt on registrations written before every write stamped it"""
+    result = await db.registrations.update_many(
+        {"updatedAt": {"$exists": False}},
+        [{"$set": {"updatedAt": "$createdAt"}}]
+    )
+    logger.info(f"Backfilled updatedAt on {result.modified_count} registrations")
+    return result.modified_count
+
+async def get_export_checkpoint(name: str, admin: dict) -> dict:
+    if not EXPORT_CHECKPOINT_NAME.match(name):
+        raise HTTPException(status_code=400, detail="Checkpoint names use 1-64 lowercase letters, digits, '-' or '_'")
+    checkpoint = await db.export_checkpoints.find_one({"_id": tenant_doc_id(name)})
+    if checkpoint:
+        return checkpoint
+    # The default checkpoint starts from the last full download, as download-new-excel always did
+    start = admin.get('last_download_all', datetime.min) if name == DEFAULT_EXPORT_CHECKPOINT else datetime.min
+    return {"_id": tenant_doc_id(name), "name": name, "watermark": start, "previousWatermark": None}
+
+async def scan_export_checkpoint(checkpoint: dict, rerun: bool) -> tuple:
+    """Registrations changed in the checkpoint's next window (or its previous one when re-running),
+    as (registrations, since, until); one range scan on the updatedAt index"""
+    if rerun:
+        if checkpoint.get('previousWatermark') is None:
+            raise HTTPException(status_code=400, detail="This checkpoint has no previous export to re-run")
+        since, until = checkpoint['previousWatermark'], checkpoint['watermark']
+    else:
+        # Writes stamped just before now may not be visible yet, so leave them for the next run
+        since = checkpoint['watermark']
+        until = datetime.utcnow() - timedelta(seconds=CHANGE_TOKEN_SETTLE_SECONDS)
+    registrations = await db.registrations.find(
+        tenant_scoped({"updatedAt": {"$gt": since, "$lte": until}})
+    ).sort("createdAt", -1).to_list(None)
+    return registrations, since, until
+
+async def advance_export_checkpoint(checkpoint: dict, until: datetime, exported: int):
+    """Move the watermark to until unless another export of this checkpoint moved it first"""
+    try:
+        await db.export_checkpoints.update_one(
+            {"_id": checkpoint['_id'], "watermark": checkpoint['watermark']},
+            {"$set": {
+                "tenantId": current_tenant.get(),
+                "name": checkpoint.get('name', checkpoint['_id']),
+                "watermark": until,
+                "previousWatermark": checkpoint['watermark'],
+                "lastExported": exported,
+                "updatedAt": datetime.utcnow()
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Another export of this checkpoint finished first; run it again")
+
+# Admin session tokens, so bcrypt runs once per session rather than once per admin action
+async def get_session_secret() -> bytes:
+    """HMAC key for session tokens, shared by every worker through db.settings unless set in the env"""
+    global session_secret
+    if session_secret is None:
+        if ADMIN_SESSION_SECRET:
+            session_secret = ADMIN_SESSION_SECRET.encode('utf-8')
+        else:
+            doc = await db.settings.find_one_and_update(
+                {"_id": "session_secret"},
+                {"$setOnInsert": {"value": secrets.token_hex(32)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            session_secret = doc['value'].encode('utf-8')
+    return session_secret
+
+session_secret = None
+
+def admin_fingerprint(admin: dict) -> str:
+    # Ties tokens to this admin (and so its tenant) and password hash, so re-registering the admin revokes them
+    return hashlib.sha256(f"{admin['_id']}:{admin['password_hash']}".encode('utf-8')).hexdigest()[:32]
+
+async def issue_session_token(admin: dict) -> tuple:
+    """Return (token, expiry) for a freshly verified admin"""
+    expires_at = int(time.time()) + ADMIN_SESSION_TTL_MINUTES * 60
+    payload = base64.urlsafe_b64encode(
+        json.dumps({"sub": admin_fingerprint(admin), "exp": expires_at}).encode('utf-8')
+    ).decode('ascii').rstrip('=')
+    signature = hmac.new(await get_session_secret(), payload.encode('ascii'), hashlib.sha256).hexdigest()
+    return f"{payload}.{signature}", datetime.utcfromtimestamp(expires_at)
+
+async def verify_session_token(token: str, admin: dict) -> bool:
+    try:
+        payload, signature = token.split('.')
+        expected = hmac.new(await get_session_secret(), payload.encode('ascii'), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(signature, expected):
+            return False
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return claims['sub'] == admin_fingerprint(admin) and claims['exp'] > time.time()
+    except (ValueError, KeyError, UnicodeError):
+        return False
+
+def admin_session_token(authorization: Optional[str] = Header(None)) -> Optional[str]:
+    """Dependency that extracts a bearer session token from the Authorization header"""
+    if authorization and authorization.lower().startswith('bearer '):
+        return authorization[7:].strip()
+    return None
 
-class RegistrationCreate(BaseModel):
-    personalInfo: PersonalInfo
-    buddies: List[Buddy]
-    nextOfKin: List[NextOfKin]
+async def authenticate_admin(password: Optional[str], token: Optional[str] = None) -> dict:
+    """Return the admin document if the session token or password is valid, else raise 400/401/404"""
+    admin = await get_cached_admin()
+    if not admin:
+        raise HTTPException(status_code=404, detail="Admin not found")
+    
+    if token:
+        if await verify_session_token(token, admin):
+            return admin
+        raise HTTPException(status_code=401, detail="Invalid or expired session token")
+    
+    if not password:
+        raise HTTPException(status_code=400, detail="Password is required")
+    
+    if not await check_password(password, admin['password_hash']):
+        raise HTTPException(status_code=401, detail="Invalid admin password")
+    
+    return admin
 
-class RegistrationResponse(BaseModel):
-    id: str
-    personalInfo: PersonalInfo
-    buddies: List[Buddy]
-    nextOfKin: List[NextOfKin]
-    createdAt: datetime
+async def authenticate_admin_from_body(request: Request, token: Optional[str] = Depends(admin_session_token)) -> dict:
+    """Dependency running authenticate_admin with the password from the raw JSON body.
+    Dependencies run before FastAPI validates a typed body, so callers without valid
+    credentials get 401 rather than the body's field-level validation errors."""
+    try:
+        body = await request.json()
+    except ValueError:
+        # Not JSON; the body validation that follows reports it
+        body = None
+    password = body.get('password') if isinstance(body, dict) else None
+    with span('authenticate'):
+        return await authenticate_admin(password if isinstance(password, str) else None, token)
 
 # Excel generation functions
 def calculate_age(date_of_birth_str: str) -> str:
@@ -449,8 +1970,24 @@ def calculate_age(date_of_birth_str: str) -> str:
     except:
         return 'N/A'
 
+def observe_excel_export(func):
+    """Record duration and workbook size of every Excel export"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        with span('excel', rows=len(args[0]) if args else 0):
+            excel_data = func(*args, **kwargs)
+        excel_export_duration.observe(time.perf_counter() - started)
+        excel_export_bytes.observe(len(excel_data))
+        return excel_data
+    return wrapper
+
+@observe_excel_export
 def create_excel_from_registrations(registrations_list: List[dict], filename: str = "registrations.xlsx") -> bytes:
     """Create Excel file from registrations data"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    
     wb = Workbook()
     ws = wb.active
     ws.title = "Buddy Registrations"
@@ -574,30 +2111,349 @@ def create_excel_from_registrations(registrations_list: List[dict], filename: st
     excel_buffer.seek(0)
     return excel_buffer.read()
 
+# Bulk import parsing
+def excel_cell_text(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%d/%m/%Y')
+    # Phone numbers typed into Excel come back as floats
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def registration_from_excel_row(row: dict) -> dict:
+    """Inverse of the row layout written by create_excel_from_registrations"""
+    personal_columns = [
+        ('Full Name', 'registrantName'), ('Apt Number', 'registrantAptNumber'),
+        ('Date of Birth', 'dateOfBirth'), ('Mobile Phone', 'registrantPhone'),
+        ('Blood Group', 'bloodGroup'), ('Insurance Policy', 'insurancePolicy'),
+        ('Insurance Company', 'insuranceCompany'), ('Doctor Name', 'doctorName'),
+        ('Doctor Contact', 'doctorContact'), ('Hospital Name', 'hospitalName'),
+        ('Hospital Reg Number', 'hospitalNumber'), ('Current Ailments', 'currentAilments'),
+    ]
+    buddy_columns = [('Name', 'name'), ('Phone', 'phone'), ('Email', 'email'), ('Apt', 'aptNumber')]
+    kin_columns = [('Name', 'name'), ('Phone', 'phone'), ('Email', 'email'),
+                   ('Country', 'country'), ('City', 'city'), ('Address', 'address')]
+    
+    registration = {
+        'personalInfo': {field: row.get(header, '') for header, field in personal_columns},
+        'buddies': [],
+        'nextOfKin': []
+    }
+    for i in range(1, 3):
+        buddy = {field: row.get(f"Buddy {i} {header}", '') for header, field in buddy_columns}
+        if any(buddy.values()):
+            registration['buddies'].append(buddy)
+    for i in range(1, 4):
+        kin = {field: row.get(f"Next of Kin {i} {header}", '') for header, field in kin_columns}
+        if kin['name'] or kin['phone'] or kin['email']:
+            # Leave blank country/city out so the model defaults apply
+            registration['nextOfKin'].append({field: value for field, value in kin.items() if value or field == 'address'})
+    
+    try:
+        registration['createdAt'] = datetime.strptime(row.get('Registration Date', ''), '%d/%m/%Y')
+    except ValueError:
+        pass
+    return registration
+
+def parse_import_rows(content: bytes, filename: str) -> List[tuple]:
+    """Split an NDJSON or Excel upload into (row number, registration dict, error) tuples"""
+    rows = []
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        wb = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        sheet_rows = wb.active.iter_rows(values_only=True)
+        headers = [excel_cell_text(value) for value in next(sheet_rows, ())]
+        for row_number, values in enumerate(sheet_rows, 2):
+            if not any(value not in (None, '') for value in values):
+                continue
+            row = dict(zip(headers, (excel_cell_text(value) for value in values)))
+            rows.append((row_number, registration_from_excel_row(row), None))
+        wb.close()
+    else:
+        for row_number, line in enumerate(content.decode('utf-8-sig').splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                payload = json.loads(line)
+                if not isinstance(payload, dict):
+                    raise ValueError("each line must be a JSON object")
+                rows.append((row_number, payload, None))
+            except ValueError as e:
+                rows.append((row_number, None, f"Invalid JSON: {str(e)}"))
+    return rows
+
+def check_registration_counts(registration: RegistrationCreate):
+    # Validate buddies count (1-2 buddies, at least 1 required)
+    if len(registration.buddies) < 1 or len(registration.buddies) > 2:
+        raise HTTPException(status_code=400, detail="Between 1 and 2 buddies are required (at least 1 is mandatory)")
+    
+    # Validate next of kin count
+    if len(registration.nextOfKin) < 1 or len(registration.nextOfKin) > 3:
+        raise HTTPException(status_code=400, detail="Between 1 and 3 next of kin contacts are required")
+
+def validate_registration_update(personal_info: dict, buddies: List[dict], next_of_kin: List[dict]) -> RegistrationUpdate:
+    """Parse admin-supplied registration parts, raising a 400 unless they are valid"""
+    try:
+        return RegistrationUpdate(personalInfo=personal_info, buddies=buddies, nextOfKin=next_of_kin)
+    except Exception as validation_error:
+        raise HTTPException(status_code=400, detail=f"Validation error: {str(validation_error)}")
+
+def registration_batch_query(batch_filter: RegistrationBatchFilter) -> dict:
+    """Mongo query for the whitelisted batch filter fields"""
+    query = {}
+    if batch_filter.registrantAptNumber:
+        query['personalInfo.registrantAptNumber'] = batch_filter.registrantAptNumber
+    if batch_filter.bloodGroup:
+        query['personalInfo.bloodGroup'] = normalize_blood_group(batch_filter.bloodGroup)
+    if batch_filter.updatedBefore:
+        # Registrations written before updatedAt existed only have createdAt
+        query['$or'] = [
+            {"updatedAt": {"$lt": batch_filter.updatedBefore}},
+            {"updatedAt": {"$exists": False}, "createdAt": {"$lt": batch_filter.updatedBefore}}
+        ]
+    if not query:
+        raise HTTPException(status_code=400, detail="Filter must set at least one field")
+    return query
+
+async def resolve_batch_targets(ids: Optional[List[str]], batch_filter: Optional[RegistrationBatchFilter]):
+    """Fetch the registrations a batch request targets.
+    Returns (documents by id, per-item results for ids that are invalid or missing)."""
+    if bool(ids) == bool(batch_filter):
+        raise HTTPException(status_code=400, detail="Provide either a list of ids or a filter")
+    
+    results = []
+    if ids:
+        if len(ids) > BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} registrations per batch")
+        object_ids = []
+        for registration_id in ids:
+            if ObjectId.is_valid(registration_id):
+                object_ids.append(ObjectId(registration_id))
+            else:
+                results.append({"id": registration_id, "status": "invalid", "error": "Invalid registration ID"})
+        query = {"_id": {"$in": object_ids}}
+    else:
+        query = registration_batch_query(batch_filter)
+    
+    docs = await db.registrations.find(tenant_scoped(query)).to_list(BATCH_MAX_ITEMS + 1)
+    if len(docs) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Filter matches more than {BATCH_MAX_ITEMS} registrations")
+    docs_by_id = {str(doc['_id']): doc for doc in docs}
+    
+    for registration_id in ids or []:
+        if ObjectId.is_valid(registration_id) and registration_id not in docs_by_id:
+            results.append({"id": registration_id, "status": "not_found", "error": "Registration not found"})
+    return docs_by_id, results
+
+async def write_registration_batch(reg_dicts: List[dict]) -> list:
+    """Upsert submissions with distinct phones in one unordered bulk_write.
+    Returns (registration, previous) or the write error for each input, in order.
+    All submissions belong to the current tenant."""
+    phones = [reg_dict['personalInfo']['registrantPhone'] for reg_dict in reg_dicts]
+    previous = {}
+    for reg in await db.registrations.find(tenant_scoped({"personalInfo.registrantPhone": {"$in": phones}})).to_list(None):
+        previous.setdefault(reg['personalInfo']['registrantPhone'], reg)
+    
+    now = datetime.utcnow()
+    first_seq = await next_change_seq(len(reg_dicts))
+    operations = []
+    for offset, (phone, reg_dict) in enumerate(zip(phones, reg_dicts)):
+        reg_dict['updatedAt'] = now
+        reg_dict['changeSeq'] = first_seq + offset
+        operations.append(UpdateOne(
+            tenant_scoped({"personalInfo.registrantPhone": phone}),
+            {"$set": reg_dict, "$setOnInsert": {"createdAt": now}},
+            upsert=True
+        ))
+    
+    failed = {}
+    try:
+        await db.registrations.bulk_write(operations, ordered=False)
+    except BulkWriteError as bulk_error:
+        for write_error in bulk_error.details.get('writeErrors', []):
+            failed[write_error['index']] = HTTPException(
+                status_code=500, detail=write_error.get('errmsg', 'Write failed')
+            )
+    
+    written_phones = [phone for index, phone in enumerate(phones) if index not in failed]
+    written_seqs = {reg_dict['changeSeq'] for reg_dict in reg_dicts}
+    current = {}
+    for reg in await db.registrations.find(
+        tenant_scoped({"personalInfo.registrantPhone": {"$in": written_phones}})
+    ).to_list(None):
+        # Prefer the document this batch wrote when a phone has more than one
+        phone = reg['personalInfo']['registrantPhone']
+        if phone not in current or reg.get('changeSeq') in written_seqs:
+            current[phone] = reg
+    
+    results = []
+    changes = []
+    for index, phone in enumerate(phones):
+        if index in failed:
+            results.append(failed[index])
+            continue
+        reg = current[phone]
+        reg_dicts[index]['createdAt'] = reg['createdAt']
+        results.append((reg, previous.get(phone)))
+        changes.append(('updated' if phone in previous else 'created', str(reg['_id']), reg, previous.get(phone)))
+    await registrations_changed(changes)
+    return results
+
+class RegistrationWriteBatcher:
+    """Absorbs submission bursts: callers wait on a future while submissions
+    collected over the batch window are written by write_registration_batch"""
+
+    def __init__(self, window_ms: float, max_size: int):
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self._pending = []
+        self._full = asyncio.Event()
+        self._flusher = None
+
+    async def submit(self, reg_dict: dict) -> tuple:
+        """Queue a validated submission; returns (registration, previous) once its batch is written"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((reg_dict, future))
+        if len(self._pending) >= self.max_size:
+            self._full.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self):
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            
+            # A phone may appear once per bulk_write; repeats wait for the next batch
+            batch, phones, deferred = [], set(), []
+            for item in self._pending:
+                phone = item[0]['personalInfo']['registrantPhone']
+                if len(batch) < self.max_size and phone not in phones:
+                    batch.append(item)
+                    phones.add(phone)
+                else:
+                    deferred.append(item)
+            self._pending = deferred
+            
+            try:
+                results = await write_registration_batch([reg_dict for reg_dict, _ in batch])
+            except Exception as e:
+                logger.error(f"Error writing registration batch: {str(e)}")
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                # The caller may have gone away (client disconnect) while the batch was written
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+# One batcher per tenant: its flush task runs in the context of the request that started it,
+# so a batch only ever holds, and is written as, a single community's submissions
+registration_write_batchers = {}
+
+def registration_write_batcher() -> RegistrationWriteBatcher:
+    tenant = current_tenant.get()
+    batcher = registration_write_batchers.get(tenant)
+    if batcher is None:
+        batcher = registration_write_batchers[tenant] = RegistrationWriteBatcher(
+            REGISTRATION_BATCH_WINDOW_MS, REGISTRATION_BATCH_MAX_SIZE
+        )
+    return batcher
+
+def request_fingerprint(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+async def claim_idempotency_key(scope: str, key: str, fingerprint: str) -> Optional[dict]:
+    """Reserve an Idempotency-Key for this request. Returns the stored response if the key
+    already completed; raises 409 while another request holds it and 422 if it was used for a different body"""
+    if len(key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+    
+    key_id = f"{scope}:{key}"
+    now = datetime.utcnow()
+    for _ in range(2):
+        try:
+            await db.idempotency_keys.insert_one(
+                {"_id": key_id, "fingerprint": fingerprint, "status": "pending", "createdAt": now}
+            )
+            return None
+        except DuplicateKeyError:
+            pass
+        existing = await db.idempotency_keys.find_one({"_id": key_id})
+        # The holder released the key between our insert and the read, so it is free to claim again
+        if existing is not None:
+            break
+    
+    if existing and existing['fingerprint'] != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    if existing and existing['status'] == 'completed':
+        return existing['response']
+    
+    # Take over a key whose request never finished (e.g. the worker was killed)
+    stale_before = now - timedelta(seconds=IDEMPOTENCY_PENDING_TIMEOUT)
+    takeover = await db.idempotency_keys.update_one(
+        {"_id": key_id, "status": "pending", "createdAt": {"$lt": stale_before}},
+        {"$set": {"createdAt": now}}
+    )
+    if takeover.modified_count:
+        return None
+    raise HTTPException(
+        status_code=409,
+        detail="A request with this Idempotency-Key is still in progress",
+        headers={"Retry-After": "1"}
+    )
+
+async def complete_idempotency_key(scope: str, key: str, response: dict):
+    await db.idempotency_keys.update_one(
+        {"_id": f"{scope}:{key}"},
+        {"$set": {"status": "completed", "response": response}}
+    )
+
+async def release_idempotency_key(scope: str, key: str):
+    """Forget a key whose request failed so the client can retry it"""
+    try:
+        await db.idempotency_keys.delete_one({"_id": f"{scope}:{key}", "status": "pending"})
+    except Exception as e:
+        logger.error(f"Failed to release Idempotency-Key: {str(e)}")
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
     return {"message": "Registration API"}
 
 # Admin endpoints
-@api_router.post("/admin/register", response_model=AdminResponse)
+@api_router.post("/admin/register", response_model=AdminResponse, dependencies=[rate_limited(password_rate_limiter)])
 async def register_admin(admin: AdminCreate):
     try:
         # Check if admin already exists
-        existing_admin = await db.admins.find_one({})
+        existing_admin = await db.admins.find_one(tenant_scoped(), {"_id": 1})
         if existing_admin:
-            raise HTTPException(status_code=400, detail="Admin already exists. Only one admin is allowed.")
+            raise HTTPException(status_code=400, detail="Admin already exists. Only one admin is allowed per community.")
         
         # Hash the password
         plain_password = admin.password
-        password_hash = bcrypt.hashpw(plain_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        password_hash = await hash_password(plain_password)
         
         admin_dict = admin.dict(exclude={'password'})
         admin_dict['password_hash'] = password_hash
         admin_dict['createdAt'] = datetime.utcnow()
         admin_dict['additional_emails'] = []
+        admin_dict['tenantId'] = current_tenant.get()
         
-        result = await db.admins.insert_one(admin_dict)
+        try:
+            result = await db.admins.insert_one(admin_dict)
+        except DuplicateKeyError:
+            # Lost a race with a concurrent registration for the same community
+            raise HTTPException(status_code=400, detail="Admin already exists. Only one admin is allowed per community.")
+        await invalidate_admin_cache()
         created_admin = await db.admins.find_one({"_id": result.inserted_id})
         
         # Send confirmation email to admin with password
@@ -616,10 +2472,48 @@ async def register_admin(admin: AdminCreate):
         logger.error(f"Error registering admin: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/health")
+async def health_check():
+    """Readiness probe: Mongo ping latency and connection pool usage; 503 until Mongo answers"""
+    mongo = {
+        "pool": {
+            "max_size": MONGO_MAX_POOL_SIZE,
+            "min_size": MONGO_MIN_POOL_SIZE,
+            "open": mongo_pool_monitor.open,
+            "in_use": mongo_pool_monitor.in_use
+        }
+    }
+    try:
+        started = time.perf_counter()
+        await db.command('ping')
+        mongo['ping_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        status_code, status = 200, "ok"
+    except Exception as e:
+        mongo['error'] = str(e)
+        status_code, status = 503, "unavailable"
+    
+    return JSONResponse(
+        status_code=status_code,
+        content={"status": status, "mongo": mongo, "bcrypt": await get_bcrypt_pool_stats()}
+    )
+
+@api_router.get("/pools/bcrypt")
+async def get_bcrypt_pool_stats():
+    """Queue depth and throughput of the password hashing pool"""
+    completed = bcrypt_pool_stats['completed']
+    return {
+        "workers": BCRYPT_MAX_WORKERS,
+        "in_flight": bcrypt_pool_stats['in_flight'],
+        "queue_depth": bcrypt_queue_depth(),
+        "max_in_flight": bcrypt_pool_stats['max_in_flight'],
+        "completed": completed,
+        "avg_wait_ms": round(bcrypt_pool_stats['total_wait_seconds'] / completed * 1000, 2) if completed else 0.0
+    }
+
 @api_router.get("/admin", response_model=Optional[AdminResponse])
 async def get_admin():
     try:
-        admin = await db.admins.find_one({})
+        admin = await get_cached_admin()
         if not admin:
             return None
         
@@ -635,22 +2529,23 @@ async def get_admin():
         logger.error(f"Error fetching admin: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.delete("/admin/delete")
+@api_router.delete("/admin/delete", dependencies=[rate_limited(password_rate_limiter)])
 async def delete_admin(request: AdminDeleteRequest):
     try:
         # Find admin with matching email
-        admin = await db.admins.find_one({"email": request.email})
+        admin = await db.admins.find_one(tenant_scoped({"email": request.email}))
         
         if not admin:
             raise HTTPException(status_code=404, detail="Admin not found with this email")
         
         # Verify password
         if 'password_hash' in admin:
-            if not bcrypt.checkpw(request.password.encode('utf-8'), admin['password_hash'].encode('utf-8')):
+            if not await check_password(request.password, admin['password_hash']):
                 raise HTTPException(status_code=401, detail="Incorrect password")
         
         # Delete the admin
         result = await db.admins.delete_one({"_id": admin['_id']})
+        await invalidate_admin_cache()
         
         if result.deleted_count == 1:
             logger.info(f"Admin deleted: {admin['email']}")
@@ -664,10 +2559,10 @@ async def delete_admin(request: AdminDeleteRequest):
         logger.error(f"Error deleting admin: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/admin/verify-password")
+@api_router.post("/admin/verify-password", dependencies=[rate_limited(password_rate_limiter)])
 async def verify_admin_password(request: dict):
     try:
-        admin = await db.admins.find_one({})
+        admin = await get_cached_admin()
         
         if not admin:
             raise HTTPException(status_code=404, detail="Admin not found")
@@ -678,8 +2573,14 @@ async def verify_admin_password(request: dict):
         
         # Verify password
         if 'password_hash' in admin:
-            if bcrypt.checkpw(password.encode('utf-8'), admin['password_hash'].encode('utf-8')):
-                return {"message": "Password verified successfully", "verified": True}
+            if await check_password(password, admin['password_hash']):
+                token, expires_at = await issue_session_token(admin)
+                return {
+                    "message": "Password verified successfully",
+                    "verified": True,
+                    "token": token,
+                    "expires_at": expires_at
+                }
             else:
                 raise HTTPException(status_code=401, detail="Incorrect password")
         else:
@@ -691,10 +2592,10 @@ async def verify_admin_password(request: dict):
         logger.error(f"Error verifying password: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.put("/admin/additional-emails")
+@api_router.put("/admin/additional-emails", dependencies=[rate_limited(password_rate_limiter)])
 async def update_additional_emails(request: dict):
     try:
-        admin = await db.admins.find_one({})
+        admin = await get_cached_admin()
         
         if not admin:
             raise HTTPException(status_code=404, detail="Admin not found")
@@ -705,7 +2606,7 @@ async def update_additional_emails(request: dict):
             raise HTTPException(status_code=400, detail="Password is required")
         
         if 'password_hash' in admin:
-            if not bcrypt.checkpw(password.encode('utf-8'), admin['password_hash'].encode('utf-8')):
+            if not await check_password(password, admin['password_hash']):
                 raise HTTPException(status_code=401, detail="Incorrect password")
         
         additional_emails = request.get("additional_emails", [])
@@ -725,6 +2626,7 @@ async def update_additional_emails(request: dict):
             {"_id": admin['_id']},
             {"$set": {"additional_emails": additional_emails}}
         )
+        await invalidate_admin_cache()
         
         if result.modified_count == 1 or result.matched_count == 1:
             logger.info(f"Additional emails updated for admin: {admin['email']}")
@@ -738,60 +2640,88 @@ async def update_additional_emails(request: dict):
         logger.error(f"Error updating additional emails: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/registrations", response_model=RegistrationResponse)
-async def create_registration(registration: RegistrationCreate):
+@api_router.post("/registrations", response_model=RegistrationResponse, dependencies=[rate_limited(submission_rate_limiter)])
+async def create_registration(registration: RegistrationCreate, response: Response,
+                              idempotency_key: Optional[str] = Header(None)):
+    key_claimed = False
+    # Keys are unique per community
+    idempotency_scope = tenant_doc_id('registrations')
     try:
-        # Validate buddies count (1-2 buddies, at least 1 required)
-        if len(registration.buddies) < 1 or len(registration.buddies) > 2:
-            raise HTTPException(status_code=400, detail="Between 1 and 2 buddies are required (at least 1 is mandatory)")
+        check_registration_counts(registration)
         
-        # Validate next of kin count
-        if len(registration.nextOfKin) < 1 or len(registration.nextOfKin) > 3:
-            raise HTTPException(status_code=400, detail="Between 1 and 3 next of kin contacts are required")
-        
-        # Check if registration already exists for this phone number
-        existing_reg = await db.registrations.find_one({
-            "personalInfo.registrantPhone": registration.personalInfo.registrantPhone
-        })
+        # A retried request returns the first response without writing or emailing again
+        if idempotency_key:
+            stored_response = await claim_idempotency_key(
+                idempotency_scope, idempotency_key, request_fingerprint(registration.dict())
+            )
+            if stored_response is not None:
+                response.headers['Idempotent-Replayed'] = 'true'
+                return stored_response
+            key_claimed = True
         
         reg_dict = registration.dict()
-        reg_dict['updatedAt'] = datetime.utcnow()
-        
-        is_update = False
-        if existing_reg:
-            # Update existing registration
-            reg_dict['createdAt'] = existing_reg['createdAt']
-            await db.registrations.update_one(
-                {"_id": existing_reg['_id']},
-                {"$set": reg_dict}
-            )
-            result_reg = await db.registrations.find_one({"_id": existing_reg['_id']})
-            is_update = True
+        reg_dict['tenantId'] = current_tenant.get()
+        reg_dict['contactKeys'] = contact_keys(reg_dict['buddies'], reg_dict['nextOfKin'])
+        reg_dict.update(apartment_fields(reg_dict['personalInfo']))
+        
+        if REGISTRATION_WRITE_BATCHING:
+            # Written together with the community's other submissions that arrive within the batch window
+            with span('batched_write'):
+                result_reg, existing_reg = await registration_write_batcher().submit(reg_dict)
+            is_update = existing_reg is not None
         else:
-            # Create new registration
-            reg_dict['createdAt'] = datetime.utcnow()
-            result = await db.registrations.insert_one(reg_dict)
-            result_reg = await db.registrations.find_one({"_id": result.inserted_id})
-            is_update = False
+            # Check if registration already exists for this phone number
+            with span('phone_lookup'):
+                existing_reg = await db.registrations.find_one(tenant_scoped({
+                    "personalInfo.registrantPhone": registration.personalInfo.registrantPhone
+                }))
+            
+            reg_dict['updatedAt'] = datetime.utcnow()
+            reg_dict['changeSeq'] = await next_change_seq()
+            
+            if existing_reg:
+                # Update existing registration
+                reg_dict['createdAt'] = existing_reg['createdAt']
+                with span('upsert', operation='update'):
+                    await db.registrations.update_one(
+                        {"_id": existing_reg['_id']},
+                        {"$set": reg_dict}
+                    )
+                with span('read_back'):
+                    result_reg = await db.registrations.find_one({"_id": existing_reg['_id']})
+                is_update = True
+            else:
+                # Create new registration
+                reg_dict['createdAt'] = datetime.utcnow()
+                with span('upsert', operation='insert'):
+                    result = await db.registrations.insert_one(reg_dict)
+                with span('read_back'):
+                    result_reg = await db.registrations.find_one({"_id": result.inserted_id})
+                is_update = False
+            
+            with span('publish_change'):
+                await registration_changed('updated' if is_update else 'created', str(result_reg['_id']), result_reg, existing_reg)
         
-        response_data = RegistrationResponse(
-            id=str(result_reg['_id']),
-            personalInfo=PersonalInfo(**result_reg['personalInfo']),
-            buddies=[Buddy(**buddy) for buddy in result_reg['buddies']],
-            nextOfKin=[NextOfKin(**kin) for kin in result_reg['nextOfKin']],
-            createdAt=result_reg['createdAt']
-        )
+        response_data = registration_to_response(result_reg)
+        
+        # Stored before the fan-out so a retry during slow SMTP sends is answered immediately
+        if key_claimed:
+            await complete_idempotency_key(
+                idempotency_scope, idempotency_key, {**response_data.dict(), 'is_update': is_update}
+            )
         
         # Send email notification to admin and additional emails
-        admin = await db.admins.find_one({})
+        admin = await get_cached_admin()
         if admin:
             # Send to primary admin email
-            await send_email_notification(admin['email'], reg_dict)
+            with span('email_notification', recipient='admin'):
+                await send_email_notification(admin['email'], reg_dict)
             
             # Send to additional emails if configured
             if 'additional_emails' in admin and admin['additional_emails']:
                 for email in admin['additional_emails']:
-                    await send_email_notification(email, reg_dict)
+                    with span('email_notification', recipient='additional'):
+                        await send_email_notification(email, reg_dict)
         
         # Add update flag to response
         response_dict = response_data.dict()
@@ -799,136 +2729,342 @@ async def create_registration(registration: RegistrationCreate):
         
         return response_dict
     except HTTPException:
+        if key_claimed:
+            await release_idempotency_key(idempotency_scope, idempotency_key)
         raise
     except Exception as e:
+        if key_claimed:
+            await release_idempotency_key(idempotency_scope, idempotency_key)
         logger.error(f"Error creating registration: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/registrations", response_model=List[RegistrationResponse])
-async def get_all_registrations():
+async def get_all_registrations(request: Request):
     try:
-        registrations = await db.registrations.find().to_list(1000)
-        return [
-            RegistrationResponse(
-                id=str(reg['_id']),
-                personalInfo=PersonalInfo(**reg['personalInfo']),
-                buddies=[Buddy(**buddy) for buddy in reg['buddies']],
-                nextOfKin=[NextOfKin(**kin) for kin in reg['nextOfKin']],
-                createdAt=reg['createdAt']
-            )
-            for reg in registrations
-        ]
+        registration_cache = registration_caches.current()
+        await registration_cache.sync()
+        cached = registration_cache.get(REGISTRATION_LIST_CACHE_KEY)
+        if cached is not None:
+            return await cached_json_response(request, cached)
+        
+        generation = registration_cache.generation
+        registrations = await db.registrations.find(tenant_scoped()).to_list(1000)
+        variants = {'identity': registration_list_adapter.dump_json(
+            [registration_to_response(reg) for reg in registrations]
+        )}
+        registration_cache.set(REGISTRATION_LIST_CACHE_KEY, variants, generation)
+        return await cached_json_response(request, variants)
     except Exception as e:
         logger.error(f"Error fetching registrations: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/registrations/events", dependencies=[rate_limited(admin_rate_limiter)])
+async def registration_events(request: Request, x_admin_password: Optional[str] = Header(None),
+                              token: Optional[str] = Depends(admin_session_token)):
+    """Admin Server-Sent Events stream of registration created/updated/deleted events.
+    EventSource cannot set headers, so the session token may also be passed as ?token= (and the tenant as ?tenant=)"""
+    await authenticate_admin(x_admin_password, token or request.query_params.get('token'))
+    
+    tenant = current_tenant.get()
+    queue = asyncio.Queue(maxsize=REGISTRATION_FEED_QUEUE_SIZE)
+    registration_feed_subscribers.setdefault(tenant, set()).add(queue)
+    
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=REGISTRATION_FEED_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            subscribers = registration_feed_subscribers.get(tenant, set())
+            subscribers.discard(queue)
+            if not subscribers:
+                registration_feed_subscribers.pop(tenant, None)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/donors")
+async def find_blood_donors(bloodGroup: str, aptNumber: Optional[str] = None, limit: int = 20):
+    """Residents who can donate to the given recipient blood group, nearest apartments first"""
+    try:
+        recipient_group = normalize_blood_group(bloodGroup)
+        donor_groups = BLOOD_DONOR_GROUPS.get(recipient_group)
+        if donor_groups is None:
+            raise HTTPException(status_code=400, detail=f"Unknown blood group: {bloodGroup}")
+        
+        limit = max(1, min(limit, 200))
+        donor_query = tenant_scoped({"personalInfo.bloodGroup": {"$in": donor_groups}})
+        
+        # The origin's block first, widening to the other blocks only while fewer than limit donors were found
+        scopes = [{}]
+        if aptNumber:
+            origin_block = stats_key(apartment_block(aptNumber))
+            scopes = [{"aptBlock": origin_block}, {"aptBlock": {"$ne": origin_block}}]
+        
+        candidates = []
+        for scope in scopes:
+            if len(candidates) >= limit:
+                break
+            # Nearest first; among equally near donors prefer an exact group match
+            candidates += await nearest_donors(
+                {**donor_query, **scope}, apartment_unit(aptNumber), recipient_group, limit - len(candidates)
+            )
+        
+        return {
+            "recipientBloodGroup": recipient_group,
+            "compatibleGroups": donor_groups,
+            "total": await db.registrations.count_documents(donor_query),
+            "donors": [
+                {
+                    "id": str(reg['_id']),
+                    "registrantName": reg['personalInfo'].get('registrantName'),
+                    "registrantAptNumber": reg['personalInfo'].get('registrantAptNumber'),
+                    "registrantPhone": reg['personalInfo'].get('registrantPhone'),
+                    "bloodGroup": reg['personalInfo'].get('bloodGroup')
+                }
+                for reg in candidates[:limit]
+            ]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error finding blood donors: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/contacts/references")
+async def find_contact_references(phone: Optional[str] = None, email: Optional[str] = None):
+    """Registrations that list the given phone or email as a buddy or next of kin"""
+    try:
+        key = contact_lookup_key(phone, email)
+        registrations = await db.registrations.find(
+            tenant_scoped({"contactKeys": key}),
+            {"personalInfo.registrantName": 1, "personalInfo.registrantAptNumber": 1, "buddies": 1, "nextOfKin": 1}
+        ).to_list(None)
+        
+        references = []
+        for reg in registrations:
+            for role, contacts in (('buddy', reg['buddies']), ('nextOfKin', reg['nextOfKin'])):
+                for idx, contact in enumerate(contacts):
+                    if contact_matches(contact, key):
+                        references.append({
+                            "registrationId": str(reg['_id']),
+                            "registrantName": reg['personalInfo'].get('registrantName'),
+                            "registrantAptNumber": reg['personalInfo'].get('registrantAptNumber'),
+                            "role": role,
+                            "index": idx,
+                            "contact": contact
+                        })
+        
+        return {"key": key, "total": len(references), "references": references}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error finding contact references: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/registrations/stats")
+async def get_registration_stats():
+    """Dashboard counts read from the materialized stats document"""
+    try:
+        stats = await db.registration_stats.find_one({"_id": tenant_doc_id('registrations')}) or {}
+        
+        current_year = datetime.utcnow().year
+        age_brackets = {}
+        for year, count in stats.get('birthYear', {}).items():
+            if count:
+                bracket = age_bracket(year, current_year)
+                age_brackets[bracket] = age_brackets.get(bracket, 0) + count
+        
+        return {
+            "total": stats.get('total', 0),
+            "bloodGroup": {name: count for name, count in stats.get('bloodGroup', {}).items() if count},
+            "aptBlock": {name: count for name, count in stats.get('aptBlock', {}).items() if count},
+            "ageBracket": age_brackets,
+            "withoutInsurance": stats.get('withoutInsurance', 0),
+            "updatedAt": stats.get('updatedAt')
+        }
+    except Exception as e:
+        logger.error(f"Error fetching registration stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/registrations/changes")
+async def get_registration_changes(since: Optional[str] = None, limit: int = 500):
+    """Upserts and deletions since a change token, for incremental client sync"""
+    try:
+        limit = max(1, min(limit, 1000))
+        settle_cutoff = datetime.utcnow().timestamp() - CHANGE_TOKEN_SETTLE_SECONDS
+        
+        reset = since is None
+        if not reset:
+            since_seq, issued_at = parse_change_token(since)
+            # Tombstones older than the TTL are gone, so an old token can no longer see every deletion
+            reset = time.time() - issued_at > REGISTRATION_TOMBSTONE_TTL_DAYS * 86400
+        
+        if reset:
+            registrations = await db.registrations.find(tenant_scoped()).sort("changeSeq", 1).to_list(None)
+            token_seq = 0
+            for reg in registrations:
+                if reg.get('updatedAt', reg['createdAt']).timestamp() <= settle_cutoff:
+                    token_seq = max(token_seq, reg.get('changeSeq', 0))
+            return {
+                "token": format_change_token(token_seq),
+                "reset": True,
+                "has_more": False,
+                "upserts": [registration_to_response(reg) for reg in registrations],
+                "deletions": []
+            }
+        
+        query = tenant_scoped({"changeSeq": {"$gt": since_seq}})
+        
+        async def fetch_changes(page_limit: int) -> List[tuple]:
+            upserts = await db.registrations.find(query).sort("changeSeq", 1).to_list(page_limit + 1)
+            tombstones = await db.registration_tombstones.find(query).sort("changeSeq", 1).to_list(page_limit + 1)
+            return merge_registration_changes(upserts, tombstones)
+        
+        changes = await fetch_changes(limit)
+        if len(changes) > limit and changes[0][0] == changes[limit][0]:
+            # More than a page of changes share the first sequence number; widen the page to hold all of them
+            group_query = tenant_scoped({"changeSeq": changes[0][0]})
+            limit = (await db.registrations.count_documents(group_query)
+                     + await db.registration_tombstones.count_documents(group_query))
+            changes = await fetch_changes(limit)
+        
+        page, token_seq, has_more = page_registration_changes(changes, since_seq, limit, settle_cutoff)
+        return {
+            "token": format_change_token(token_seq),
+            "reset": False,
+            "has_more": has_more,
+            "upserts": [registration_to_response(doc) for _, _, doc, deleted in page if not deleted],
+            "deletions": [str(doc['_id']) for _, _, doc, deleted in page if deleted]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching registration changes: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.get("/registrations/{registration_id}", response_model=RegistrationResponse)
-async def get_registration_by_id(registration_id: str):
+async def get_registration_by_id(registration_id: str, request: Request):
     try:
         if not ObjectId.is_valid(registration_id):
             raise HTTPException(status_code=400, detail="Invalid registration ID")
         
-        reg = await db.registrations.find_one({"_id": ObjectId(registration_id)})
+        registration_cache = registration_caches.current()
+        await registration_cache.sync()
+        cache_key = registration_cache_key(registration_id)
+        cached = registration_cache.get(cache_key)
+        if cached is not None:
+            return await cached_json_response(request, cached)
+        
+        generation = registration_cache.generation
+        reg = await db.registrations.find_one(tenant_scoped({"_id": ObjectId(registration_id)}))
         
         if not reg:
             raise HTTPException(status_code=404, detail="Registration not found")
         
-        return RegistrationResponse(
-            id=str(reg['_id']),
-            personalInfo=PersonalInfo(**reg['personalInfo']),
-            buddies=[Buddy(**buddy) for buddy in reg['buddies']],
-            nextOfKin=[NextOfKin(**kin) for kin in reg['nextOfKin']],
-            createdAt=reg['createdAt']
-        )
+        variants = {'identity': registration_to_response(reg).model_dump_json().encode('utf-8')}
+        registration_cache.set(cache_key, variants, generation)
+        return await cached_json_response(request, variants)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching registration: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.put("/registrations/{registration_id}")
+@app.exception_handler(RequestValidationError)
+async def registration_update_validation_handler(request: Request, exc: RequestValidationError):
+    """The admin edit screen shows detail as text, so an invalid registration update
+    keeps its 400 "Validation error: ..." string instead of FastAPI's 422 error list"""
+    route = request.scope.get('route')
+    if request.method == 'PUT' and getattr(route, 'path', None) == '/api/registrations/{registration_id}':
+        errors = '; '.join(
+            f"{'.'.join(str(part) for part in error['loc'][1:])}: {error['msg']}" for error in exc.errors()
+        )
+        return JSONResponse(status_code=400, content={"detail": f"Validation error: {errors}"})
+    return await request_validation_exception_handler(request, exc)
+
+@api_router.put("/registrations/{registration_id}",
+                dependencies=[rate_limited(admin_rate_limiter), Depends(authenticate_admin_from_body)])
 async def update_registration_admin(registration_id: str, request: AdminRegistrationUpdateRequest):
     """Admin endpoint to update a registration with password verification"""
     try:
-        # Verify admin exists and password is correct
-        admin = await db.admins.find_one({})
-        if not admin:
-            raise HTTPException(status_code=404, detail="Admin not found")
-        
-        if not bcrypt.checkpw(request.password.encode('utf-8'), admin['password_hash'].encode('utf-8')):
-            raise HTTPException(status_code=401, detail="Invalid admin password")
-        
         # Validate registration ID
         if not ObjectId.is_valid(registration_id):
             raise HTTPException(status_code=400, detail="Invalid registration ID")
         
         # Check if registration exists
-        existing_reg = await db.registrations.find_one({"_id": ObjectId(registration_id)})
+        with span('registration_lookup'):
+            existing_reg = await db.registrations.find_one(tenant_scoped({"_id": ObjectId(registration_id)}))
         if not existing_reg:
             raise HTTPException(status_code=404, detail="Registration not found")
         
-        # Validate the updated data structure
-        try:
-            # Validate personal info
-            PersonalInfo(**request.personalInfo)
-            # Validate buddies (1-2 required)
-            if len(request.buddies) < 1 or len(request.buddies) > 2:
-                raise HTTPException(status_code=400, detail="Exactly 1-2 buddies are required")
-            for buddy in request.buddies:
-                Buddy(**buddy)
-            # Validate next of kin (1-3 required) 
-            if len(request.nextOfKin) < 1 or len(request.nextOfKin) > 3:
-                raise HTTPException(status_code=400, detail="1-3 next of kin contacts are required")
-            for kin in request.nextOfKin:
-                NextOfKin(**kin)
-        except Exception as validation_error:
-            raise HTTPException(status_code=400, detail=f"Validation error: {str(validation_error)}")
+        # The body was validated once, into typed models, when FastAPI parsed the request
+        registration_parts = request.model_dump(exclude={'password'})
         
         # Update registration
         update_data = {
-            'personalInfo': request.personalInfo,
-            'buddies': request.buddies,
-            'nextOfKin': request.nextOfKin,
-            'updatedAt': datetime.utcnow()
+            'personalInfo': registration_parts['personalInfo'],
+            'buddies': registration_parts['buddies'],
+            'nextOfKin': registration_parts['nextOfKin'],
+            'updatedAt': datetime.utcnow(),
+            'changeSeq': await next_change_seq(),
+            'contactKeys': contact_keys(registration_parts['buddies'], registration_parts['nextOfKin']),
+            **apartment_fields(registration_parts['personalInfo'])
         }
         
-        await db.registrations.update_one(
-            {"_id": ObjectId(registration_id)},
-            {"$set": update_data}
-        )
+        with span('update'):
+            await db.registrations.update_one(
+                {"_id": ObjectId(registration_id)},
+                {"$set": update_data}
+            )
         
         # Fetch updated registration
-        updated_reg = await db.registrations.find_one({"_id": ObjectId(registration_id)})
+        with span('read_back'):
+            updated_reg = await db.registrations.find_one(tenant_scoped({"_id": ObjectId(registration_id)}))
         
+        with span('publish_change'):
+            await registration_changed('updated', registration_id, updated_reg, existing_reg)
+        
+        # Reuses the request's models; model instances are not validated again
         response_data = RegistrationResponse(
-            id=str(updated_reg['_id']),
-            personalInfo=PersonalInfo(**updated_reg['personalInfo']),
-            buddies=[Buddy(**buddy) for buddy in updated_reg['buddies']],
-            nextOfKin=[NextOfKin(**kin) for kin in updated_reg['nextOfKin']],
+            id=registration_id,
+            personalInfo=request.personalInfo,
+            buddies=request.buddies,
+            nextOfKin=request.nextOfKin,
             createdAt=updated_reg['createdAt']
         )
         
         # Send email notifications for the update
         try:
-            admin = await db.admins.find_one({})
+            admin = await get_cached_admin()
             if admin:
                 # Send to primary admin email
-                await send_email_notification(admin['email'], updated_reg)
+                with span('email_notification', recipient='admin'):
+                    await send_email_notification(admin['email'], updated_reg)
                 
                 # Send to additional emails if configured
                 if 'additional_emails' in admin and admin['additional_emails']:
                     for email in admin['additional_emails']:
-                        await send_email_notification(email, updated_reg)
+                        with span('email_notification', recipient='additional'):
+                            await send_email_notification(email, updated_reg)
                 
                 # Send to registrant's buddies
                 for buddy in updated_reg['buddies']:
                     if buddy.get('email'):
-                        await send_email_notification(buddy['email'], updated_reg)
+                        with span('email_notification', recipient='buddy'):
+                            await send_email_notification(buddy['email'], updated_reg)
                 
                 # Send to next of kin
                 for kin in updated_reg['nextOfKin']:
                     if kin.get('email'):
-                        await send_email_notification(kin['email'], updated_reg)
+                        with span('email_notification', recipient='nextOfKin'):
+                            await send_email_notification(kin['email'], updated_reg)
                 
             logger.info(f"Update notification emails sent for registration {registration_id}")
         except Exception as email_error:
@@ -944,33 +3080,38 @@ async def update_registration_admin(registration_id: str, request: AdminRegistra
         logger.error(f"Error updating registration: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.delete("/registrations/{registration_id}")
-async def delete_registration_admin(registration_id: str, request: AdminRegistrationDeleteRequest):
+@api_router.delete("/registrations/{registration_id}", dependencies=[rate_limited(admin_rate_limiter)])
+async def delete_registration_admin(registration_id: str, request: AdminRegistrationDeleteRequest,
+                                    token: Optional[str] = Depends(admin_session_token)):
     """Admin endpoint to delete a registration with password verification"""
     try:
-        # Verify admin exists and password is correct
-        admin = await db.admins.find_one({})
-        if not admin:
-            raise HTTPException(status_code=404, detail="Admin not found")
-        
-        if not bcrypt.checkpw(request.password.encode('utf-8'), admin['password_hash'].encode('utf-8')):
-            raise HTTPException(status_code=401, detail="Invalid admin password")
+        # Verify admin exists and the session token or password is correct
+        await authenticate_admin(request.password, token)
         
         # Validate registration ID
         if not ObjectId.is_valid(registration_id):
             raise HTTPException(status_code=400, detail="Invalid registration ID")
         
         # Check if registration exists
-        existing_reg = await db.registrations.find_one({"_id": ObjectId(registration_id)})
+        existing_reg = await db.registrations.find_one(tenant_scoped({"_id": ObjectId(registration_id)}))
         if not existing_reg:
             raise HTTPException(status_code=404, detail="Registration not found")
         
+        # Leave a tombstone so delta sync clients learn about the deletion
+        await db.registration_tombstones.replace_one(
+            {"_id": ObjectId(registration_id)},
+            {"tenantId": current_tenant.get(), "changeSeq": await next_change_seq(), "deletedAt": datetime.utcnow()},
+            upsert=True
+        )
+        
         # Delete registration
         result = await db.registrations.delete_one({"_id": ObjectId(registration_id)})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Registration not found or already deleted")
         
+        await registration_changed('deleted', registration_id, previous=existing_reg)
+        
         logger.info(f"Admin deleted registration {registration_id}")
         return {"message": "Registration deleted successfully", "deleted_id": registration_id}
         
@@ -980,24 +3121,360 @@ async def delete_registration_admin(registration_id: str, request: AdminRegistra
         logger.error(f"Error deleting registration: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/admin/registrations/batch-update", dependencies=[rate_limited(admin_rate_limiter)])
+async def batch_update_registrations_admin(request: AdminRegistrationBatchUpdateRequest,
+                                           token: Optional[str] = Depends(admin_session_token)):
+    """Admin endpoint to update many registrations with one password check and one bulk_write.
+    Unlike the single update, no notification emails are sent."""
+    try:
+        await authenticate_admin(request.password, token)
+        
+        if request.filter is not None:
+            if request.items:
+                raise HTTPException(status_code=400, detail="Provide either items or a filter")
+            if not request.personalInfo:
+                raise HTTPException(status_code=400, detail="personalInfo fields to set are required with a filter")
+            allowed_fields = set(PersonalInfo.model_fields) - {'registrantPhone'}
+            for field, value in request.personalInfo.items():
+                if field not in allowed_fields or not isinstance(value, str):
+                    raise HTTPException(status_code=400, detail=f"Cannot batch set personalInfo.{field}")
+        
+        docs_by_id, results = await resolve_batch_targets(
+            [item.id for item in request.items] if request.items else None, request.filter
+        )
+        
+        now = datetime.utcnow()
+        # One sequence number per write; numbers reserved for invalid items are simply skipped
+        first_seq = await next_change_seq(len(docs_by_id))
+        operations = []
+        targets = []
+        if request.filter is not None:
+            update = {f"personalInfo.{field}": value for field, value in request.personalInfo.items()}
+            update.update(updatedAt=now)
+            if 'registrantAptNumber' in request.personalInfo:
+                update.update(apartment_fields(request.personalInfo))
+            for registration_id in docs_by_id:
+                operations.append(UpdateOne(
+                    {"_id": ObjectId(registration_id)},
+                    {"$set": {**update, "changeSeq": first_seq + len(operations)}}
+                ))
+                targets.append(registration_id)
+        else:
+            for item in request.items:
+                if item.id not in docs_by_id:
+                    continue
+                # Items stay raw dicts so one invalid item is reported without failing the batch
+                try:
+                    registration_parts = validate_registration_update(
+                        item.personalInfo, item.buddies, item.nextOfKin
+                    ).model_dump()
+                except HTTPException as validation_error:
+                    results.append({"id": item.id, "status": "invalid", "error": validation_error.detail})
+                    continue
+                operations.append(UpdateOne({"_id": ObjectId(item.id)}, {"$set": {
+                    'personalInfo': registration_parts['personalInfo'],
+                    'buddies': registration_parts['buddies'],
+                    'nextOfKin': registration_parts['nextOfKin'],
+                    'updatedAt': now,
+                    'changeSeq': first_seq + len(operations),
+                    'contactKeys': contact_keys(registration_parts['buddies'], registration_parts['nextOfKin']),
+                    **apartment_fields(registration_parts['personalInfo'])
+                }}))
+                targets.append(item.id)
+        
+        failed = {}
+        if operations:
+            try:
+                await db.registrations.bulk_write(operations, ordered=False)
+            except BulkWriteError as bulk_error:
+                for write_error in bulk_error.details.get('writeErrors', []):
+                    failed[targets[write_error['index']]] = write_error.get('errmsg', 'Write failed')
+        
+        updated_ids = [registration_id for registration_id in targets if registration_id not in failed]
+        updated_regs = await db.registrations.find(
+            {"_id": {"$in": [ObjectId(registration_id) for registration_id in updated_ids]}}
+        ).to_list(None)
+        await registrations_changed([
+            ('updated', str(reg['_id']), reg, docs_by_id[str(reg['_id'])]) for reg in updated_regs
+        ])
+        
+        results.extend({"id": registration_id, "status": "updated"} for registration_id in updated_ids)
+        results.extend({"id": registration_id, "status": "failed", "error": error} for registration_id, error in failed.items())
+        
+        logger.info(f"Admin batch updated {len(updated_ids)} registrations")
+        return {"updated_count": len(updated_ids), "results": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error batch updating registrations: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/admin/registrations/batch-delete", dependencies=[rate_limited(admin_rate_limiter)])
+async def batch_delete_registrations_admin(request: AdminRegistrationBatchDeleteRequest,
+                                           token: Optional[str] = Depends(admin_session_token)):
+    """Admin endpoint to delete many registrations with one password check and one delete_many"""
+    try:
+        await authenticate_admin(request.password, token)
+        
+        docs_by_id, results = await resolve_batch_targets(request.ids, request.filter)
+        
+        if docs_by_id:
+            object_ids = [ObjectId(registration_id) for registration_id in docs_by_id]
+            
+            # Leave tombstones so delta sync clients learn about the deletions
+            first_seq = await next_change_seq(len(object_ids))
+            now = datetime.utcnow()
+            await db.registration_tombstones.bulk_write([
+                UpdateOne(
+                    {"_id": object_id},
+                    {"$set": {"tenantId": current_tenant.get(), "changeSeq": first_seq + offset, "deletedAt": now}},
+                    upsert=True
+                )
+                for offset, object_id in enumerate(object_ids)
+            ], ordered=False)
+            
+            # Delete by the ids we read, so nothing is removed without a tombstone
+            await db.registrations.delete_many({"_id": {"$in": object_ids}})
+            
+            await registrations_changed([
+                ('deleted', registration_id, None, doc) for registration_id, doc in docs_by_id.items()
+            ])
+        
+        results.extend({"id": registration_id, "status": "deleted"} for registration_id in docs_by_id)
+        
+        logger.info(f"Admin batch deleted {len(docs_by_id)} registrations")
+        return {"deleted_count": len(docs_by_id), "results": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error batch deleting registrations: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/admin/contacts/replace", dependencies=[rate_limited(admin_rate_limiter)])
+async def replace_contact_admin(request: ContactReplaceRequest,
+                                token: Optional[str] = Depends(admin_session_token)):
+    """Admin endpoint to replace a buddy/next of kin's details in every registration that lists them"""
+    try:
+        await authenticate_admin(request.password, token)
+        
+        key = contact_lookup_key(request.phone, request.email)
+        new_values = {
+            field: value for field, value in
+            (('name', request.newName), ('phone', request.newPhone), ('email', request.newEmail))
+            if value
+        }
+        if not new_values:
+            raise HTTPException(status_code=400, detail="Provide at least one of newName, newPhone or newEmail")
+        
+        previous_regs = await db.registrations.find(tenant_scoped({"contactKeys": key})).to_list(None)
+        if not previous_regs:
+            return {"message": "No registrations reference this contact", "modified_count": 0}
+        
+        # Array filters compare stored values, so collect the raw spellings behind the normalized key
+        match_field = key.partition(':')[0]
+        raw_values = sorted({
+            contact[match_field]
+            for reg in previous_regs
+            for contact in reg['buddies'] + reg['nextOfKin']
+            if contact_matches(contact, key)
+        })
+        
+        update = {'updatedAt': datetime.utcnow()}
+        for array, identifier in (('buddies', 'buddy'), ('nextOfKin', 'kin')):
+            for field, value in new_values.items():
+                update[f"{array}.$[{identifier}].{field}"] = value
+        array_filters = [
+            {f"buddy.{match_field}": {"$in": raw_values}},
+            {f"kin.{match_field}": {"$in": raw_values}}
+        ]
+        
+        # One write per registration so each gets its own change sequence number
+        registration_ids = [reg['_id'] for reg in previous_regs]
+        first_seq = await next_change_seq(len(registration_ids))
+        result = await db.registrations.bulk_write([
+            UpdateOne(
+                {"_id": registration_id},
+                {"$set": {**update, 'changeSeq': first_seq + offset}},
+                array_filters=array_filters
+            )
+            for offset, registration_id in enumerate(registration_ids)
+        ], ordered=False)
+        
+        # contactKeys is derived from the arrays, so refresh it where the replacement changed it
+        updated_regs = await db.registrations.find({"_id": {"$in": registration_ids}}).to_list(None)
+        key_updates = []
+        for reg in updated_regs:
+            keys = contact_keys(reg['buddies'], reg['nextOfKin'])
+            if keys != reg.get('contactKeys'):
+                reg['contactKeys'] = keys
+                key_updates.append(UpdateOne({"_id": reg['_id']}, {"$set": {"contactKeys": keys}}))
+        if key_updates:
+            await db.registrations.bulk_write(key_updates, ordered=False)
+        
+        previous_by_id = {reg['_id']: reg for reg in previous_regs}
+        await registrations_changed([
+            ('updated', str(reg['_id']), reg, previous_by_id.get(reg['_id']))
+            for reg in updated_regs
+        ])
+        
+        logger.info(f"Admin replaced contact {key} in {result.modified_count} registrations")
+        return {"message": "Contact replaced successfully", "modified_count": result.modified_count}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error replacing contact: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/admin/registrations/import", dependencies=[rate_limited(admin_rate_limiter)])
+async def import_registrations_admin(
+    file: UploadFile = File(...),
+    password: Optional[str] = Form(None),
+    notify: str = Form('none'),
+    token: Optional[str] = Depends(admin_session_token)
+):
+    """Admin endpoint to upsert registrations by phone from an NDJSON file or an exported Excel workbook.
+    Per-registration emails are skipped; notify='digest' sends one summary email instead."""
+    try:
+        admin = await authenticate_admin(password, token)
+        
+        if notify not in ('none', 'digest'):
+            raise HTTPException(status_code=400, detail="notify must be 'none' or 'digest'")
+        
+        content = await file.read()
+        try:
+            rows = await asyncio.to_thread(parse_import_rows, content, file.filename or '')
+        except Exception as parse_error:
+            raise HTTPException(status_code=400, detail=f"Could not read import file: {str(parse_error)}")
+        
+        errors = []
+        created = 0
+        updated = 0
+        for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+            # Validate the batch, keeping the last row for each phone number
+            valid = {}
+            for row_number, payload, error in rows[start:start + IMPORT_BATCH_SIZE]:
+                if error:
+                    errors.append({"row": row_number, "error": error})
+                    continue
+                try:
+                    registration = RegistrationCreate(**payload)
+                    check_registration_counts(registration)
+                except HTTPException as validation_error:
+                    errors.append({"row": row_number, "error": validation_error.detail})
+                    continue
+                except Exception as validation_error:
+                    errors.append({"row": row_number, "error": f"Validation error: {str(validation_error)}"})
+                    continue
+                
+                phone = registration.personalInfo.registrantPhone
+                if phone in valid:
+                    errors.append({"row": valid[phone][0], "error": f"Superseded by row {row_number} with the same phone"})
+                created_at = payload.get('createdAt')
+                valid[phone] = (row_number, registration.dict(), created_at if isinstance(created_at, datetime) else None)
+            
+            if not valid:
+                continue
+            
+            phones = list(valid)
+            previous = {
+                reg['personalInfo']['registrantPhone']: reg
+                for reg in await db.registrations.find(
+                    tenant_scoped({"personalInfo.registrantPhone": {"$in": phones}})
+                ).to_list(None)
+            }
+            
+            now = datetime.utcnow()
+            first_seq = await next_change_seq(len(phones))
+            operations = []
+            for offset, phone in enumerate(phones):
+                _, reg_dict, created_at = valid[phone]
+                reg_dict['tenantId'] = current_tenant.get()
+                reg_dict['updatedAt'] = now
+                reg_dict['changeSeq'] = first_seq + offset
+                reg_dict['contactKeys'] = contact_keys(reg_dict['buddies'], reg_dict['nextOfKin'])
+                reg_dict.update(apartment_fields(reg_dict['personalInfo']))
+                operations.append(UpdateOne(
+                    tenant_scoped({"personalInfo.registrantPhone": phone}),
+                    {"$set": reg_dict, "$setOnInsert": {"createdAt": created_at or now}},
+                    upsert=True
+                ))
+            
+            failed_phones = set()
+            try:
+                await db.registrations.bulk_write(operations, ordered=False)
+            except BulkWriteError as bulk_error:
+                for write_error in bulk_error.details.get('writeErrors', []):
+                    phone = phones[write_error['index']]
+                    failed_phones.add(phone)
+                    errors.append({"row": valid[phone][0], "error": write_error.get('errmsg', 'Write failed')})
+            
+            written_phones = [phone for phone in phones if phone not in failed_phones]
+            current = await db.registrations.find(
+                tenant_scoped({"personalInfo.registrantPhone": {"$in": written_phones}})
+            ).to_list(None)
+            changes = []
+            for reg in current:
+                previous_reg = previous.get(reg['personalInfo']['registrantPhone'])
+                changes.append(('updated' if previous_reg else 'created', str(reg['_id']), reg, previous_reg))
+            await registrations_changed(changes)
+            
+            updated += sum(1 for phone in written_phones if phone in previous)
+            created += sum(1 for phone in written_phones if phone not in previous)
+        
+        errors.sort(key=lambda error: error['row'])
+        summary = {
+            "filename": file.filename,
+            "total_rows": len(rows),
+            "created": created,
+            "updated": updated,
+            "failed": len(errors),
+            "errors": errors
+        }
+        
+        if notify == 'digest' and (created or updated):
+            await send_import_digest_email(admin['email'], summary)
+            for email in admin.get('additional_emails') or []:
+                await send_import_digest_email(email, summary)
+        
+        logger.info(f"Admin imported {created} new and {updated} updated registrations from {file.filename}")
+        return summary
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error importing registrations: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/admin/stats/rebuild", dependencies=[rate_limited(admin_rate_limiter)])
+async def rebuild_stats_admin(request: AdminRegistrationDeleteRequest,
+                              token: Optional[str] = Depends(admin_session_token)):
+    """Admin endpoint to recompute the dashboard statistics from all registrations"""
+    try:
+        await authenticate_admin(request.password, token)
+        stats = await rebuild_registration_stats()
+        return {"message": "Statistics rebuilt successfully", "total": stats.get('total', 0)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error rebuilding stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Admin Excel download endpoints
-@api_router.post("/admin/download-all-excel")
-async def download_all_registrations_excel(request: AdminRegistrationDeleteRequest):
+@api_router.post("/admin/download-all-excel", dependencies=[rate_limited(admin_rate_limiter)])
+async def download_all_registrations_excel(request: AdminRegistrationDeleteRequest,
+                                           token: Optional[str] = Depends(admin_session_token)):
     """Admin endpoint to download all registrations as Excel with password verification"""
     try:
-        # Verify admin exists and password is correct
-        admin = await db.admins.find_one({})
-        if not admin:
-            raise HTTPException(status_code=404, detail="Admin not found")
-        
-        if not bcrypt.checkpw(request.password.encode('utf-8'), admin['password_hash'].encode('utf-8')):
-            raise HTTPException(status_code=401, detail="Invalid admin password")
+        # Verify admin exists and the session token or password is correct
+        with span('authenticate'):
+            admin = await authenticate_admin(request.password, token)
         
         # Fetch all registrations
-        registrations_cursor = db.registrations.find({}).sort("createdAt", -1)
-        registrations = []
-        async for reg in registrations_cursor:
-            registrations.append(reg)
+        snapshot_at = datetime.utcnow() - timedelta(seconds=CHANGE_TOKEN_SETTLE_SECONDS)
+        with span('fetch_registrations'):
+            registrations_cursor = db.registrations.find(tenant_scoped()).sort("createdAt", -1)
+            registrations = []
+            async for reg in registrations_cursor:
+                registrations.append(reg)
         
         if not registrations:
             raise HTTPException(status_code=404, detail="No registrations found")
@@ -1005,16 +3482,30 @@ async def download_all_registrations_excel(request: AdminRegistrationDeleteReque
         # Create Excel file
         excel_data = create_excel_from_registrations(registrations, "All_Buddy_Registrations.xlsx")
         
-        # Update admin's last download timestamp
-        await db.admins.update_one(
-            {"_id": ObjectId(admin['_id'])},
-            {"$set": {"last_download_all": datetime.utcnow()}}
-        )
+        # Update admin's last download timestamp; later "new" downloads start from this snapshot
+        with span('record_download'):
+            await db.admins.update_one(
+                {"_id": ObjectId(admin['_id'])},
+                {"$set": {"last_download_all": datetime.utcnow()}}
+            )
+            await invalidate_admin_cache()
+            await db.export_checkpoints.update_one(
+                {"_id": tenant_doc_id(DEFAULT_EXPORT_CHECKPOINT)},
+                {"$set": {
+                    "tenantId": current_tenant.get(),
+                    "name": DEFAULT_EXPORT_CHECKPOINT,
+                    "watermark": snapshot_at,
+                    "previousWatermark": None,
+                    "updatedAt": datetime.utcnow()
+                }},
+                upsert=True
+            )
         
         logger.info(f"Admin downloaded all {len(registrations)} registrations as Excel")
         
         # Return Excel data as base64
-        excel_base64 = base64.b64encode(excel_data).decode('utf-8')
+        with span('encode'):
+            excel_base64 = base64.b64encode(excel_data).decode('utf-8')
         current_date = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"All_Buddy_Registrations_{current_date}.xlsx"
         
@@ -1030,71 +3521,108 @@ async def download_all_registrations_excel(request: AdminRegistrationDeleteReque
         logger.error(f"Error downloading all registrations: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/admin/download-new-excel")
-async def download_new_registrations_excel(request: AdminRegistrationDeleteRequest):
-    """Admin endpoint to download only new/updated registrations since last download"""
+@api_router.post("/admin/download-new-excel", dependencies=[rate_limited(admin_rate_limiter)])
+async def download_new_registrations_excel(request: AdminRegistrationDeleteRequest,
+                                           token: Optional[str] = Depends(admin_session_token)):
+    """Admin endpoint to download only new/updated registrations since the last download"""
+    return await export_checkpoint_excel(
+        DEFAULT_EXPORT_CHECKPOINT, ExportCheckpointRequest(password=request.password), token
+    )
+
+@api_router.post("/admin/exports/{checkpoint}/excel", dependencies=[rate_limited(admin_rate_limiter)])
+async def export_checkpoint_excel(checkpoint: str, request: ExportCheckpointRequest,
+                                  token: Optional[str] = Depends(admin_session_token)):
+    """Admin endpoint to download registrations changed since the named checkpoint (e.g. 'weekly-report')
+    and advance it. rerun=true downloads the previous window again without moving the checkpoint."""
     try:
-        # Verify admin exists and password is correct
-        admin = await db.admins.find_one({})
-        if not admin:
-            raise HTTPException(status_code=404, detail="Admin not found")
+        # Verify admin exists and the session token or password is correct
+        with span('authenticate'):
+            admin = await authenticate_admin(request.password, token)
         
-        if not bcrypt.checkpw(request.password.encode('utf-8'), admin['password_hash'].encode('utf-8')):
-            raise HTTPException(status_code=401, detail="Invalid admin password")
-        
-        # Get last download timestamp
-        last_download = admin.get('last_download_all', datetime.min)
-        
-        # Fetch registrations created/updated after last download
-        registrations_cursor = db.registrations.find({
-            "$or": [
-                {"createdAt": {"$gt": last_download}},
-                {"updatedAt": {"$gt": last_download}}
-            ]
-        }).sort("createdAt", -1)
-        
-        registrations = []
-        async for reg in registrations_cursor:
-            registrations.append(reg)
+        current = await get_export_checkpoint(checkpoint, admin)
+        with span('fetch_registrations'):
+            registrations, since, until = await scan_export_checkpoint(current, request.rerun)
         
         if not registrations:
             return {
                 "message": "No new registrations since last download",
-                "total_new": 0
+                "checkpoint": checkpoint,
+                "total_new": 0,
+                "since_date": since.strftime('%d/%m/%Y %H:%M:%S')
             }
         
         # Create Excel file
         excel_data = create_excel_from_registrations(registrations, "New_Buddy_Registrations.xlsx")
         
-        # Update admin's last download timestamp
-        await db.admins.update_one(
-            {"_id": ObjectId(admin['_id'])},
-            {"$set": {"last_download_new": datetime.utcnow()}}
-        )
+        if not request.rerun:
+            with span('record_download'):
+                await advance_export_checkpoint(current, until, len(registrations))
         
-        logger.info(f"Admin downloaded {len(registrations)} new registrations as Excel")
+        logger.info(f"Admin exported {len(registrations)} changed registrations for checkpoint '{checkpoint}'")
         
         # Return Excel data as base64
-        excel_base64 = base64.b64encode(excel_data).decode('utf-8')
+        with span('encode'):
+            excel_base64 = base64.b64encode(excel_data).decode('utf-8')
         current_date = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"New_Buddy_Registrations_{current_date}.xlsx"
+        suffix = '' if checkpoint == DEFAULT_EXPORT_CHECKPOINT else f"_{checkpoint}"
+        filename = f"New_Buddy_Registrations{suffix}_{current_date}.xlsx"
         
         return {
             "excel_data": excel_base64,
             "filename": filename,
+            "checkpoint": checkpoint,
             "total_new": len(registrations),
-            "since_date": last_download.strftime('%d/%m/%Y %H:%M:%S')
+            "since_date": since.strftime('%d/%m/%Y %H:%M:%S'),
+            "until_date": until.strftime('%d/%m/%Y %H:%M:%S')
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error downloading new registrations: {str(e)}")
+        logger.error(f"Error exporting checkpoint {checkpoint}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/admin/exports", dependencies=[rate_limited(admin_rate_limiter)])
+async def list_export_checkpoints(x_admin_password: Optional[str] = Header(None),
+                                  token: Optional[str] = Depends(admin_session_token)):
+    """Admin endpoint listing export checkpoints and their watermarks"""
+    await authenticate_admin(x_admin_password, token)
+    checkpoints = await db.export_checkpoints.find(tenant_scoped()).sort("_id", 1).to_list(None)
+    return [
+        {
+            # Checkpoints written before tenancy have no name field; their _id is the name
+            "checkpoint": checkpoint.get('name', checkpoint['_id']),
+            "watermark": checkpoint['watermark'],
+            "previousWatermark": checkpoint.get('previousWatermark'),
+            "lastExported": checkpoint.get('lastExported'),
+            "updatedAt": checkpoint.get('updatedAt')
+        }
+        for checkpoint in checkpoints
+    ]
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape target; each worker process reports its own series"""
+    lines = []
+    for histogram in (http_request_duration, mongo_operation_duration, smtp_send_duration,
+                      excel_export_duration, excel_export_bytes):
+        lines.extend(histogram.render())
+    # Stands in for the email queue depth: requests await their sends inline, so sends in flight are the backlog
+    lines.extend(render_gauge('smtp_sends_in_flight', 'SMTP sends currently in progress', smtp_sends_in_flight))
+    lines.extend(render_gauge('bcrypt_queue_depth', 'Password hashes waiting for a worker', bcrypt_queue_depth()))
+    lines.extend(render_gauge('mongo_pool_connections_open', 'Open MongoDB connections', mongo_pool_monitor.open))
+    lines.extend(render_gauge('mongo_pool_connections_in_use', 'Checked-out MongoDB connections', mongo_pool_monitor.in_use))
+    return PlainTextResponse('\n'.join(lines) + '\n', media_type='text/plain; version=0.0.4')
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Innermost, so request metrics and Server-Timing include compression time
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(TenantMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1110,6 +3638,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+async def ensure_indexes():
+    try:
+        # Every query is tenant scoped, so tenantId leads each index; the TTL indexes must stay single-field
+        await db.registrations.create_index([("tenantId", 1), ("changeSeq", 1)])
+        await db.registrations.create_index([("tenantId", 1), ("personalInfo.bloodGroup", 1)])
+        # Donor search: nearest units within the origin's block, then across the other blocks
+        await db.registrations.create_index([("tenantId", 1), ("personalInfo.bloodGroup", 1), ("aptBlock", 1), ("aptUnit", 1)])
+        await db.registrations.create_index([("tenantId", 1), ("personalInfo.bloodGroup", 1), ("aptUnit", 1)])
+        await db.registrations.create_index([("tenantId", 1), ("contactKeys", 1)])
+        await db.registrations.create_index([("tenantId", 1), ("personalInfo.registrantPhone", 1)])
+        await db.registrations.create_index([("tenantId", 1), ("createdAt", -1)])
+        await db.registration_tombstones.create_index([("tenantId", 1), ("changeSeq", 1)])
+        await db.registration_tombstones.create_index(
+            "deletedAt", expireAfterSeconds=REGISTRATION_TOMBSTONE_TTL_DAYS * 86400
+        )
+        await db.rate_limits.create_index("expiresAt", expireAfterSeconds=0)
+        await db.registrations.create_index([("tenantId", 1), ("updatedAt", 1)])
+        await db.idempotency_keys.create_index("createdAt", expireAfterSeconds=IDEMPOTENCY_KEY_TTL_HOURS * 3600)
+        # One admin per community
+        await db.admins.create_index("tenantId", unique=True)
+        await db.export_checkpoints.create_index("tenantId")
+    except Exception as e:
+        logger.error(f"Error creating indexes: {str(e)}")
+
+if __name__ == "__main__":
+    import sys
+    # Maintenance commands, e.g. python server.py rebuild-stats
+    commands = {
+        'rebuild-stats': rebuild_all_registration_stats,
+        'backfill-contact-keys': backfill_contact_keys,
+        'backfill-apartment-fields': backfill_apartment_fields,
+        'backfill-updated-at': backfill_updated_at,
+        'backfill-tenant-ids': backfill_tenant_ids,
+    }
+    async def run_command(command):
+        await connect_to_mongo()
+        await command()
+        client.close()
+    
+    if len(sys.argv) == 2 and sys.argv[1] in commands:
+        asyncio.run(run_command(commands[sys.argv[1]]))
+    else:
+        print(f"Usage: python server.py [{'|'.join(commands)}]")
@@ -210,6 +210,9 @@ export default function RegistrationForm() {
         setShowAdminModal(false);
         setAdminPassword('');
         router.push('/registrations');
+      } else if (response.status === 429) {
+        const error = await response.json();
+        showAlert('Too Many Attempts', error.detail || 'Please try again later');
       } else {
         showAlert('Access Denied', 'Invalid admin password');
       }
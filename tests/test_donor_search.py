@@ -0,0 +1,76 @@
+"""GET /api/donors must rank donors as a full sort of every compatible registration would"""
+
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+
+import mongomock_motor
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+# server.py reads these at import time; the tests run against an in-memory MongoDB
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'test_donor_search')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server
+
+GROUPS = list(server.BLOOD_DONOR_GROUPS)
+
+
+def registrations(count, rng):
+    docs = []
+    for index in range(count):
+        apt = rng.choice([
+            f"{rng.choice('ABC')}-{rng.randint(1, 15)}{rng.randint(1, 8):02d}",
+            f"{rng.choice('ABC')}{rng.randint(1, 15)}{rng.randint(1, 8):02d}",
+            "Villa X",
+            ""
+        ])
+        personal_info = {
+            "registrantName": f"Resident {index}", "registrantAptNumber": apt,
+            "registrantPhone": str(index), "bloodGroup": rng.choice(GROUPS)
+        }
+        docs.append({
+            "_id": ObjectId(), "tenantId": server.DEFAULT_TENANT, "personalInfo": personal_info,
+            **server.apartment_fields(personal_info)
+        })
+    return docs
+
+
+@pytest.fixture
+def client(monkeypatch):
+    mongo = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(server, 'db', mongo['test_donor_search'])
+    return TestClient(server.app)
+
+
+def test_matches_full_sort_of_compatible_donors(client):
+    rng = random.Random(3)
+    docs = registrations(600, rng)
+    asyncio.run(server.db.registrations.insert_many(docs))
+    by_id = {str(doc['_id']): doc for doc in docs}
+
+    for _ in range(60):
+        blood_group = rng.choice(GROUPS)
+        origin = rng.choice([None, "A-703", "B1204", "C-101", "Villa Q", "Z-305"])
+        limit = rng.choice([1, 5, 20, 200])
+        params = {"bloodGroup": blood_group, "limit": limit}
+        if origin:
+            params["aptNumber"] = origin
+        body = client.get('/api/donors', params=params).json()
+
+        def rank(doc):
+            personal_info = doc['personalInfo']
+            return (
+                server.apartment_distance(personal_info['registrantAptNumber'], origin),
+                personal_info['bloodGroup'] != blood_group
+            )
+
+        compatible = [doc for doc in docs if doc['personalInfo']['bloodGroup'] in server.BLOOD_DONOR_GROUPS[blood_group]]
+        expected = [rank(doc) for doc in sorted(compatible, key=rank)[:limit]]
+        assert [rank(by_id[donor['id']]) for donor in body['donors']] == expected, params
+        assert body['total'] == len(compatible)
@@ -0,0 +1,38 @@
+"""Claiming an Idempotency-Key"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import mongomock_motor
+
+# server.py reads these at import time; the tests run against an in-memory MongoDB
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'test_idempotency')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server
+
+
+def test_key_released_while_claiming_is_claimed_again(monkeypatch):
+    # One collection object, so its find_one can be replaced for the whole scenario
+    keys = mongomock_motor.AsyncMongoMockClient()['test_idempotency'].idempotency_keys
+    monkeypatch.setattr(server, 'db', SimpleNamespace(idempotency_keys=keys))
+    find_one = keys.find_one
+
+    async def released_before_read(query):
+        # The holder fails and releases the key after our insert hit the duplicate
+        monkeypatch.setattr(keys, 'find_one', find_one)
+        await server.release_idempotency_key('registrations', 'key-1')
+        return await find_one(query)
+
+    async def scenario():
+        assert await server.claim_idempotency_key('registrations', 'key-1', 'body') is None
+        monkeypatch.setattr(keys, 'find_one', released_before_read)
+        assert await server.claim_idempotency_key('registrations', 'key-1', 'body') is None
+        claimed = await find_one({"_id": "registrations:key-1"})
+        assert claimed['status'] == 'pending'
+
+    asyncio.run(scenario())
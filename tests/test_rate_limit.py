@@ -0,0 +1,45 @@
+"""Which address a request is rate limited by"""
+
+import ipaddress
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from starlette.requests import Request
+
+# server.py reads these at import time; the unit tests never connect to MongoDB
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'test_rate_limit')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server
+
+
+@pytest.fixture(autouse=True)
+def trusted_proxies(monkeypatch):
+    monkeypatch.setattr(server, 'RATE_LIMIT_TRUSTED_PROXIES', [
+        ipaddress.ip_network('10.0.0.0/8'), ipaddress.ip_network('127.0.0.1/32')
+    ])
+
+
+def request(peer, forwarded=None):
+    headers = [(b'x-forwarded-for', forwarded.encode())] if forwarded else []
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': headers, 'client': (peer, 50000)})
+
+
+def test_untrusted_peer_cannot_choose_its_key():
+    assert server.client_key(request('203.0.113.7', '198.51.100.1')) == '203.0.113.7'
+
+
+def test_client_behind_trusted_proxies():
+    assert server.client_key(request('10.1.2.3', '198.51.100.1')) == '198.51.100.1'
+    assert server.client_key(request('10.1.2.3', '198.51.100.1, 127.0.0.1')) == '198.51.100.1'
+
+
+def test_spoofed_entries_left_of_the_client_are_ignored():
+    assert server.client_key(request('10.1.2.3', '1.1.1.1, 198.51.100.1')) == '198.51.100.1'
+
+
+def test_trusted_peer_without_header_is_its_own_key():
+    assert server.client_key(request('10.1.2.3')) == '10.1.2.3'
@@ -0,0 +1,140 @@
+"""Paging and change token rules of GET /api/registrations/changes"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import mongomock_motor
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+# server.py reads these at import time; the unit tests never connect to MongoDB
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'test_registration_changes')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+SETTLED = NOW - timedelta(minutes=5)
+SETTLE_CUTOFF = (NOW - timedelta(seconds=2)).timestamp()
+
+
+def upsert(seq, changed_at=SETTLED):
+    return {"_id": ObjectId(), "changeSeq": seq, "updatedAt": changed_at}
+
+
+def tombstone(seq, changed_at=SETTLED):
+    return {"_id": ObjectId(), "changeSeq": seq, "deletedAt": changed_at}
+
+
+def page(docs, since_seq=0, limit=500):
+    upserts = [doc for doc in docs if 'updatedAt' in doc]
+    tombstones = [doc for doc in docs if 'deletedAt' in doc]
+    changes = server.merge_registration_changes(upserts, tombstones)[:limit + 1]
+    return server.page_registration_changes(changes, since_seq, limit, SETTLE_CUTOFF)
+
+
+def seqs(changes):
+    return [change[0] for change in changes]
+
+
+def test_merges_upserts_and_deletions_in_sequence_order():
+    changes, token_seq, has_more = page([upsert(3), tombstone(2), upsert(1)])
+    assert seqs(changes) == [1, 2, 3]
+    assert [deleted for _, _, _, deleted in changes] == [False, True, False]
+    assert token_seq == 3
+    assert not has_more
+
+
+def test_full_page_moves_token_to_its_last_change():
+    changes, token_seq, has_more = page([upsert(seq) for seq in range(1, 6)], limit=2)
+    assert seqs(changes) == [1, 2]
+    assert token_seq == 2
+    assert has_more
+
+
+def test_page_never_ends_inside_a_shared_sequence_number():
+    # Rows 2-4 were written by one bulk write; a limit of 2 would otherwise split them
+    docs = [upsert(1)] + [upsert(2) for _ in range(3)] + [upsert(3)]
+    changes, token_seq, has_more = page(docs, limit=2)
+    assert seqs(changes) == [1]
+    assert token_seq == 1
+    assert has_more
+
+    changes, token_seq, has_more = page(docs[1:], since_seq=1, limit=4)
+    assert seqs(changes) == [2, 2, 2, 3]
+    assert token_seq == 3
+    assert not has_more
+
+
+def test_unsettled_page_does_not_ask_for_more():
+    fresh = NOW
+    changes, token_seq, has_more = page([upsert(seq, fresh) for seq in range(6, 10)], since_seq=5, limit=2)
+    assert seqs(changes) == [6, 7]
+    assert token_seq == 5
+    assert not has_more
+
+
+def test_token_stops_at_last_settled_change():
+    changes, token_seq, has_more = page([upsert(1), upsert(2), upsert(3, NOW), upsert(4)], limit=3)
+    assert seqs(changes) == [1, 2, 3]
+    assert token_seq == 2
+    assert not has_more
+
+
+def test_empty_page_keeps_token():
+    changes, token_seq, has_more = page([], since_seq=7)
+    assert changes == []
+    assert token_seq == 7
+    assert not has_more
+
+
+def registration(seq):
+    return {
+        "_id": ObjectId(),
+        "tenantId": server.DEFAULT_TENANT,
+        "personalInfo": {
+            "registrantName": f"Resident {seq}", "registrantAptNumber": "A-101", "dateOfBirth": "01/02/1980",
+            "registrantPhone": str(ObjectId()), "bloodGroup": "O+"
+        },
+        "buddies": [{"name": "Buddy", "phone": "222", "email": "buddy@example.com", "aptNumber": "A-102"}],
+        "nextOfKin": [{"name": "Kin", "phone": "333", "email": "kin@example.com"}],
+        "changeSeq": seq,
+        "createdAt": SETTLED,
+        "updatedAt": SETTLED
+    }
+
+
+def test_following_has_more_delivers_every_change(monkeypatch):
+    mongo = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(server, 'db', mongo['test_registration_changes'])
+    monkeypatch.setattr(server, 'CHANGE_TOKEN_SETTLE_SECONDS', 0)
+
+    # A group of five sharing one sequence number is larger than the page
+    docs = [registration(1)] + [registration(2) for _ in range(5)] + [registration(3)]
+    asyncio.run(server.db.registrations.insert_many(docs))
+    client = TestClient(server.app)
+
+    delivered = []
+    token = server.format_change_token(0)
+    for _ in range(10):
+        body = client.get('/api/registrations/changes', params={"since": token, "limit": 2}).json()
+        delivered.extend(upsert['id'] for upsert in body['upserts'])
+        token = body['token']
+        if not body['has_more']:
+            break
+    assert sorted(delivered) == sorted(str(doc['_id']) for doc in docs)
+    assert server.parse_change_token(token)[0] == 3
+
+
+def test_reserved_blocks_do_not_overlap(monkeypatch):
+    mongo = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(server, 'db', mongo['test_registration_changes'])
+
+    async def reserve():
+        return [await server.next_change_seq(3), await server.next_change_seq(), await server.next_change_seq(2)]
+
+    assert asyncio.run(reserve()) == [1, 4, 5]